@@ -1,6 +1,17 @@
 import streamlit as st
 from zhipuai import ZhipuAI
+import hashlib
+import json
 import os
+import threading
+from collections import OrderedDict
+
+MODEL = "glm-4-flashx"
+# 修改转换用的提示词后把版本号加一，旧提示词得到的缓存结果就不会再被使用
+PROMPT_VERSION = 1
+CACHE_SIZE = 128
+# 设置了环境变量 JIGANG_PROMPT_CACHE_DIR 时，转换结果同时保存到该目录，重启后仍然有效
+CACHE_DIR = os.getenv("JIGANG_PROMPT_CACHE_DIR")
 
 # 从环境变量获取API密钥
 api_key = os.getenv("ZHIPUAI_API_KEY")
@@ -15,7 +26,76 @@ if not api_key:
 # 初始化ZhipuAI客户端
 client = ZhipuAI(api_key=api_key)
 
-def convert_lisp_to_prompt(lisp_code, output_format):
+class ConversionCache:
+    # 转换结果的缓存：内存中保留最近使用的 max_size 条，超出时淘汰最久没用的；指定 directory 时还会读写磁盘。
+    # 所有会话共用一个实例，所以读写内存时要加锁
+    def __init__(self, max_size=CACHE_SIZE, directory=None):
+        self.max_size = max_size
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(lisp_code, output_format, model=MODEL, version=PROMPT_VERSION):
+        code_hash = hashlib.sha256(lisp_code.encode("utf-8")).hexdigest()
+        text = json.dumps([code_hash, output_format, model, version])
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                value = json.load(f)["prompt"]
+        except (OSError, ValueError, KeyError):
+            return None
+        self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if not self.directory:
+            return
+        # 先写临时文件再改名，其他进程不会读到写了一半的文件
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"prompt": value}, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except OSError:
+            pass  # 磁盘缓存写不进去时只用内存缓存
+
+    def _remember(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+# Streamlit 每次交互都会从头运行脚本，缓存对象要放在 cache_resource 里才能在多次运行和多个会话之间保留
+@st.cache_resource
+def get_conversion_cache():
+    return ConversionCache(CACHE_SIZE, CACHE_DIR)
+
+def convert_lisp_to_prompt(lisp_code, output_format, refresh=False):
+    # refresh 为 True 时不使用缓存，重新调用模型并更新缓存
+    cache = get_conversion_cache()
+    key = ConversionCache.key(lisp_code, output_format)
+    if not refresh:
+        prompt = cache.get(key)
+        if prompt is not None:
+            st.caption("使用了缓存的转换结果")
+            return prompt
     try:
         system_content = """你是一个专业的程序员，擅长将 Lisp 伪代码转换为详细的自然语言提示词。你的任务是完全理解 Lisp 代码的每个细节，然后创建一个全面的提示词，确保原始代码中的所有信息都被准确转换。"""
         
@@ -38,14 +118,15 @@ Lisp 伪代码：
 {lisp_code}"""
 
         response = client.chat.completions.create(
-            model="glm-4-flashx",
+            model=MODEL,
             messages=[
                 {"role": "system", "content": system_content},
                 {"role": "user", "content": user_content}
             ]
         )
-        prompt = response.choices[0].message.content
-        return prompt.strip()
+        prompt = response.choices[0].message.content.strip()
+        cache.put(key, prompt)  # 出错时不缓存
+        return prompt
     except Exception as e:
         st.error(f"转换过程中发生错误: {str(e)}")
         return None
@@ -59,7 +140,7 @@ def generate_response(prompt, user_input, output_format):
             user_message = f"请生成SVG代码,要求尽量美观，输入为: {user_input}"
         
         response = client.chat.completions.create(
-            model="glm-4-flashx",
+            model=MODEL,
             messages=[
                 {"role": "system", "content": prompt},
                 {"role": "user", "content": user_message}
@@ -103,10 +184,11 @@ if 'output_format' not in st.session_state:
 lisp_code = st.text_area("请输入lisp伪代码提示词:", height=300)
 
 output_format = st.radio("选择输出格式:", ("SVG", "HTML5"))
+refresh = st.checkbox("强制刷新（不使用缓存的转换结果）")
 
 if st.button("转换"):
     if lisp_code:
-        st.session_state.prompt = convert_lisp_to_prompt(lisp_code, output_format)
+        st.session_state.prompt = convert_lisp_to_prompt(lisp_code, output_format, refresh)
         st.session_state.output_format = output_format
         
 if st.session_state.prompt:
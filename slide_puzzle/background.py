@@ -0,0 +1,81 @@
+import sys
+import threading
+import time
+
+# 后台求解：在工作线程中运行求解函数，游戏主循环每帧调用 poll() 检查结果，界面不会卡住。
+# 求解函数需要接受 progress 和 on_level 关键字参数并传给 solver.solve，取消就是在 progress 回调里抛出异常。
+
+# 求解期间缩短线程切换间隔，让主循环拿到 GIL 的等待时间远小于一帧
+SOLVING_SWITCH_INTERVAL = 0.001
+
+
+class SearchCancelled(Exception):
+    pass
+
+
+class BackgroundSolver:
+    def __init__(self):
+        self.thread = None
+        self.result = None
+        self.error = None
+        self.states = 0          # 目前已搜索的状态数
+        self.levels = []         # 已完成各层的统计（见 solver.SearchMonitor）
+        self.started_at = 0
+        self._cancelled = False
+        self._finished = False
+        self._switch_interval = None
+
+    @property
+    def running(self):
+        return self.thread is not None and not self._finished
+
+    @property
+    def pending(self):
+        # 求解中，或者已经结束但还没有被 poll() 取走结果
+        return self.thread is not None
+
+    def start(self, func, *args, **kwargs):
+        # 上一次求解的结果还没有被 poll() 取走时不开始新的求解：否则结果会被丢掉，
+        # 而且保存的会是已经缩短的切换间隔，之后再也恢复不了
+        if self.pending:
+            return
+        self.result = None
+        self.error = None
+        self.states = 0
+        self.levels = []
+        self.started_at = time.time()
+        self._cancelled = False
+        self._finished = False
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(SOLVING_SWITCH_INTERVAL)
+        self.thread = threading.Thread(target=self._run, args=(func, args, kwargs), daemon=True)
+        self.thread.start()
+
+    def _run(self, func, args, kwargs):
+        try:
+            self.result = func(*args, progress=self._progress, on_level=self.levels.append, **kwargs)
+        except SearchCancelled:
+            pass
+        except Exception as e:
+            self.error = e
+        finally:
+            self._finished = True
+
+    def _progress(self, states):
+        self.states = states
+        if self._cancelled:
+            raise SearchCancelled()
+
+    def cancel(self):
+        self._cancelled = True
+
+    def elapsed(self):
+        return time.time() - self.started_at
+
+    def poll(self):
+        # 求解结束（包括被取消）后第一次调用返回 True，此时可以读取 result / error
+        if self.thread is None or not self._finished:
+            return False
+        self.thread = None
+        sys.setswitchinterval(self._switch_interval)
+        return not self._cancelled
@@ -0,0 +1,108 @@
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from solver import BFS, MOVE_MODELS, STRATEGIES, UNIT, Board, MemoryLimitExceeded, SearchTimeout, solve
+
+# 批量求解：从 JSON Lines 读取布局，多进程求解，按输入顺序以 JSON Lines 输出结果
+# 每行输入是 find_img.process_image 返回的方块列表 [[x, y, color, w, h, direction], ...]，
+# 或者 {"id": ..., "blocks": [...]}。金色方块（钥匙）右边缘到达右边界即为解开。
+#
+# 用法: python batch_solve.py layouts.jsonl -o results.jsonl -j 8 --timeout 30
+
+
+def make_board(blocks, grid_size=6, move_model=UNIT, max_bytes=None):
+    specs = [(x, y, width, height, direction) for x, y, _, width, height, direction in blocks]
+    key_index = next((i for i, block in enumerate(blocks) if block[2] == 'GOLD'), None)
+    if key_index is None:
+        raise ValueError("布局中没有金色方块")
+    key_width = blocks[key_index][3]
+    goal_positions = [(grid_size - key_width, y) for y in range(grid_size)]
+    return Board(specs, key_index, goal_positions, grid_size, move_model, max_bytes)
+
+
+def solve_layout(task):
+    # 在工作进程中求解一个布局，超时和内存超限都作为结果返回而不是抛出
+    index, line, options = task
+    result = {'index': index}
+    started = time.perf_counter()
+    stats = {}
+    try:
+        record = json.loads(line)
+        if isinstance(record, dict):
+            if 'id' in record:
+                result['id'] = record['id']
+            blocks = record['blocks']
+        else:
+            blocks = record
+        board = make_board(blocks, options['grid_size'], options['move_model'], options['max_bytes'])
+        start = board.pack([(block[0], block[1]) for block in blocks])
+        path = solve(board, start, options['max_bytes'], options['strategy'], options['timeout'], stats)
+        if path is None:
+            result['status'] = 'unsolvable'
+        else:
+            result['status'] = 'solved'
+            result['solution_length'] = len(path)
+            if options['include_solution']:
+                result['solution'] = path
+    except SearchTimeout:
+        result['status'] = 'timeout'
+    except (MemoryLimitExceeded, MemoryError):
+        # 真正的内存不足也只记在这个布局上，不让整批求解中止
+        result['status'] = 'memory_limit'
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        result['status'] = 'error'
+        result['error'] = str(e)
+    result['nodes_expanded'] = stats.get('nodes_expanded', 0)
+    result['wall_time'] = round(time.perf_counter() - started, 6)
+    return result
+
+
+def read_tasks(lines, options):
+    for index, line in enumerate(lines):
+        line = line.strip()
+        if line:
+            yield index, line, options
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量求解滑块拼图布局")
+    parser.add_argument('input', nargs='?', help="输入的 JSON Lines 文件，默认读取标准输入")
+    parser.add_argument('-o', '--output', help="输出文件，默认写到标准输出")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help="工作进程数")
+    parser.add_argument('--timeout', type=float, default=None, help="每个布局的求解时间上限（秒）")
+    parser.add_argument('--memory-limit', type=int, default=512, help="每个工作进程的求解内存上限（MB）")
+    parser.add_argument('--strategy', choices=STRATEGIES, default=BFS)
+    parser.add_argument('--move-model', choices=MOVE_MODELS, default=UNIT)
+    parser.add_argument('--grid-size', type=int, default=6)
+    parser.add_argument('--solution', action='store_true', help="输出完整的移动序列")
+    args = parser.parse_args(argv)
+
+    options = {
+        'grid_size': args.grid_size,
+        'move_model': args.move_model,
+        'strategy': args.strategy,
+        'timeout': args.timeout,
+        'max_bytes': args.memory_limit * 1024 * 1024,
+        'include_solution': args.solution,
+    }
+    source = open(args.input, encoding='utf-8') if args.input else sys.stdin
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        with Pool(args.jobs) as pool:
+            # imap 按输入顺序逐个返回结果；chunksize=1 让耗时差异大的布局也能均匀分给各个进程
+            for result in pool.imap(solve_layout, read_tasks(source, options), chunksize=1):
+                output.write(json.dumps(result, ensure_ascii=False) + '\n')
+                output.flush()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from solver import MOVE_MODELS, STRATEGIES
+
+# 求解器基准测试：对布局语料库中的每个布局分别调用 main.solve_puzzle 和 origin/game.get_solution，
+# 记录解的步数、展开节点数、每秒节点数、峰值内存和耗时，结果写成 JSON，便于在不同提交之间比较。
+# 语料库每行是 {"id", "grade", "source", "optimal", "blocks"}，blocks 与 batch_solve.py 的输入格式相同，
+# optimal 是逐格移动的最少步数，结果不符时状态记为 wrong_length。
+#
+# 用法: python benchmark.py -o bench.json
+#       python benchmark.py -o new.json --compare bench.json
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_PATH = os.path.join(BASE_DIR, 'benchmark_corpus.jsonl')
+GRADES = ('trivial', 'easy', 'medium', 'hard', 'hardest')
+TARGETS = ('solve_puzzle', 'get_solution')
+
+
+def load_games():
+    # 导入两个游戏模块，导入本身不会打开窗口或识别截图
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+    for path in (BASE_DIR, os.path.join(BASE_DIR, 'origin')):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    import main
+    import game
+    return main, game
+
+
+def run_solve_puzzle(module, blocks, stats):
+    colors = {'GREEN': module.GREEN, 'RED': module.RED, 'GOLD': module.GOLD}
+    game_blocks = [module.Block(x, y, colors[color], w, h, direction) for x, y, color, w, h, direction in blocks]
+    return module.solve_puzzle(game_blocks, stats=stats)
+
+
+def run_get_solution(module, blocks, stats):
+    colors = {'GREEN': module.GREEN, 'RED': module.RED, 'GOLD': module.GOLD}
+    others, key = [], None
+    for x, y, color, w, h, direction in blocks:
+        block = module.Block(x, y, colors[color], w, h, direction)
+        if color == 'GOLD':
+            key = block
+        else:
+            others.append(block)
+    return module.get_solution(others, key, stats=stats)
+
+
+def read_corpus(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def measure(run, module, blocks, repeat, trace_memory):
+    # 取 repeat 次中最快的一次；峰值内存另外跑一次，避免 tracemalloc 拖慢计时
+    best, stats, solution = None, {}, None
+    for _ in range(repeat):
+        run_stats = {}
+        started = time.perf_counter()
+        solution = run(module, blocks, run_stats)
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best:
+            best, stats = elapsed, run_stats
+    peak = None
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            run(module, blocks, {})
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return solution, stats, best, peak
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=BASE_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip() != ''
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def compare(results, baseline_path):
+    # 与之前的结果逐项比较，返回步数发生变化的项数
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['id'], r['target']): r for r in json.load(f)['results']}
+    changed = 0
+    print(f"\n与 {baseline_path} 比较:")
+    for result in results:
+        old = baseline.get((result['id'], result['target']))
+        if old is None:
+            continue
+        if old['solution_length'] != result['solution_length']:
+            changed += 1
+            print(f"  {result['id']:<16} {result['target']:<13} 步数变化: {old['solution_length']} -> {result['solution_length']}")
+        if old['wall_time'] and result['wall_time']:
+            ratio = result['wall_time'] / old['wall_time']
+            print(f"  {result['id']:<16} {result['target']:<13} 耗时 x{ratio:.2f}")
+    return changed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="滑块拼图求解器基准测试")
+    parser.add_argument('--corpus', default=CORPUS_PATH, help="布局语料库（JSON Lines）")
+    parser.add_argument('-o', '--output', help="结果输出文件（JSON）")
+    parser.add_argument('--compare', help="与之前输出的结果文件比较")
+    parser.add_argument('--grade', choices=GRADES, action='append', help="只运行指定难度，可重复")
+    parser.add_argument('--target', choices=TARGETS, action='append', help="只运行指定的求解入口，可重复")
+    parser.add_argument('--strategy', choices=STRATEGIES, help="覆盖两个游戏的 SOLVER_STRATEGY")
+    parser.add_argument('--move-model', choices=MOVE_MODELS, help="覆盖两个游戏的 SOLVER_MOVE_MODEL")
+    parser.add_argument('--repeat', type=int, default=3, help="每个布局计时的次数，取最快一次")
+    parser.add_argument('--no-memory', action='store_true', help="不测量峰值内存")
+    args = parser.parse_args(argv)
+
+    main_module, game_module = load_games()
+    runners = {'solve_puzzle': (run_solve_puzzle, main_module), 'get_solution': (run_get_solution, game_module)}
+    for module in (main_module, game_module):
+        if args.strategy:
+            module.SOLVER_STRATEGY = args.strategy
+        if args.move_model:
+            module.SOLVER_MOVE_MODEL = args.move_model
+
+    corpus = [entry for entry in read_corpus(args.corpus) if not args.grade or entry['grade'] in args.grade]
+    results = []
+    for entry in corpus:
+        for target in args.target or TARGETS:
+            run, module = runners[target]
+            solution, stats, wall_time, peak = measure(run, module, entry['blocks'], args.repeat, not args.no_memory)
+            length = None if solution is None else len(solution)
+            if solution is None:
+                status = 'unsolved'
+            elif entry.get('optimal') is not None and length != entry['optimal'] and not args.move_model:
+                status = 'wrong_length'
+            else:
+                status = 'ok'
+            nodes = stats.get('nodes_expanded', 0)
+            result = {
+                'id': entry['id'],
+                'grade': entry['grade'],
+                'target': target,
+                'status': status,
+                'solution_length': length,
+                'nodes_expanded': nodes,
+                'states_stored': stats.get('states_stored', 0),
+                'wall_time': round(wall_time, 6),
+                'nodes_per_sec': round(nodes / wall_time) if wall_time else None,
+                'peak_memory': peak,
+            }
+            results.append(result)
+            memory = '-' if peak is None else f"{peak / 1024 / 1024:.1f}MB"
+            print(f"{entry['id']:<16} {entry['grade']:<8} {target:<13} {status:<12} "
+                  f"步数 {str(length):>4}  节点 {nodes:>9}  {result['nodes_per_sec'] or 0:>9}/s  "
+                  f"{wall_time:8.3f}s  {memory:>8}")
+
+    commit, dirty = git_commit()
+    report = {
+        'commit': commit,
+        'dirty': dirty,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'strategy': main_module.SOLVER_STRATEGY,
+        'move_model': main_module.SOLVER_MOVE_MODEL,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    failed = sum(result['status'] != 'ok' for result in results)
+    if args.compare:
+        failed += compare(results, args.compare)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
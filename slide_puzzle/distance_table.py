@@ -0,0 +1,163 @@
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+
+from solver import SEEN_STATE_BYTES, MemoryLimitExceeded, SearchMonitor
+
+# 整个状态空间的距离表
+# 从所有已解开的状态出发反向广度优先搜索一次，记录每个可解状态到目标的最少步数，
+# 之后任何局面的提示或完整解法都只是查表。
+# 文件格式：文件头 | 按大小排好序的打包状态 (uint64) | 对应的距离 (uint8 或 uint16)
+# 有可互换的方块时只保存规范形式（见 Board.canonical），查表时先转换
+
+MAGIC = b'SPDT'
+VERSION = 3
+HEADER = struct.Struct('<4sHcxQ')  # 魔数, 版本, 距离类型码, 状态数
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache')
+
+_open_tables = {}
+
+
+def layout_key(board):
+    # 距离表只取决于方块的形状、所在行列、同一行（列）中的先后顺序、目标和移动模型，与当前位置无关。
+    # 同一行的横向方块（同一列的纵向方块）不能互相越过，先后顺序不同时可达的状态也不同（见 Board.goal_states）
+    blocks = []
+    for x, y, width, height, direction in board.specs:
+        line = y if direction == 'horizontal' else x if direction == 'vertical' else None
+        rank = None
+        if line is not None:
+            axis = 0 if direction == 'horizontal' else 1
+            rank = sum(1 for ox, oy, _, _, other in board.specs
+                       if other == direction and (ox, oy)[1 - axis] == line and (ox, oy)[axis] < (x, y)[axis])
+        blocks.append((width, height, direction, line, rank))
+    layout = (VERSION, board.grid_size, blocks, board.goal_block, sorted(board.goal_positions), board.move_model)
+    return hashlib.sha1(repr(layout).encode()).hexdigest()[:16]
+
+
+class DistanceTable:
+    def __init__(self, board, path):
+        self.board = board
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, typecode, size = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"无效的距离表文件: {path}")
+        self._view = memoryview(self._mmap)
+        keys_end = HEADER.size + 8 * size
+        self.keys = self._view[HEADER.size:keys_end].cast('Q')
+        self.distances = self._view[keys_end:].cast(typecode.decode())
+
+    def __len__(self):
+        return len(self.keys)
+
+    def distance(self, state):
+        # 到目标的最少步数，无法解开的状态返回 None
+        state = self.board.canonical(state)
+        i = bisect_left(self.keys, state)
+        if i < len(self.keys) and self.keys[i] == state:
+            return self.distances[i]
+        return None
+
+    def hint(self, state):
+        # 下一步该走的移动 (方块序号, dx, dy)，已解开或无解时返回 None
+        distance = self.distance(state)
+        if not distance:
+            return None
+        for new_state, move in self.board.successors(state):
+            if self.distance(new_state) == distance - 1:
+                return self.board.moves[move]
+        return None
+
+    def solution(self, state):
+        # 沿距离递减的方向走到目标，无解时返回 None
+        distance = self.distance(state)
+        if distance is None:
+            return None
+        path = []
+        while distance:
+            for new_state, move in self.board.successors(state):
+                if self.distance(new_state) == distance - 1:
+                    path.append(self.board.moves[move])
+                    state, distance = new_state, distance - 1
+                    break
+            else:
+                return None  # 距离表与布局不符
+        return path
+
+    def close(self):
+        self.keys.release()
+        self.distances.release()
+        self._view.release()
+        self._mmap.close()
+
+
+def build_table(board, path, max_bytes=None, progress=None, stats=None, on_level=None):
+    # 从所有目标状态出发逐层反向搜索（移动都是可逆的），写出距离表文件
+    # progress、stats、on_level 与 solver.solve 相同：progress 定期以已保存的状态数调用，可以抛出异常来中止建表；
+    # 每完成一层以该层的统计调用 on_level，depth 是到目标的步数
+    if board.state_bits > 64:
+        raise ValueError("状态超过 64 位，无法建立距离表")
+    successors = board.canonical_successors if board.symmetry else board.successors
+    monitor = SearchMonitor({} if stats is None else stats, on_level)
+    states = array('Q')
+    levels = [0]
+    seen = set()
+    for state in board.goal_states():
+        seen.add(state)
+        states.append(state)
+
+    previous_start = level_start = 0
+    while level_start < len(states):
+        level_end = len(states)
+        levels.append(level_end)
+        generated = 0
+        for index in range(level_start, level_end):
+            for new_state, _ in successors(states[index]):
+                generated += 1
+                if new_state not in seen:
+                    seen.add(new_state)
+                    states.append(new_state)
+            if not index & 0xfff:
+                if max_bytes is not None:
+                    used = states.itemsize * len(states) + len(seen) * SEEN_STATE_BYTES
+                    if used > max_bytes:
+                        raise MemoryLimitExceeded(f"建立距离表超出内存上限: {used} > {max_bytes} 字节")
+                if progress is not None:
+                    progress(len(states))
+        for index in range(previous_start, level_start):
+            seen.discard(states[index])
+        monitor.level(len(levels) - 2, level_end - level_start, generated, len(states) - level_end, len(states),
+                      states.itemsize * len(states) + len(seen) * SEEN_STATE_BYTES)
+        previous_start, level_start = level_start, level_end
+    del seen
+
+    typecode = 'B' if len(levels) <= 256 else 'H'
+    distances = array(typecode)
+    for distance in range(len(levels) - 1):
+        distances.extend(array(typecode, [distance]) * (levels[distance + 1] - levels[distance]))
+    order = sorted(range(len(states)), key=states.__getitem__)
+    keys = array('Q', (states[i] for i in order))
+    sorted_distances = array(typecode, (distances[i] for i in order))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, typecode.encode(), len(keys)))
+        keys.tofile(f)
+        sorted_distances.tofile(f)
+    os.replace(tmp_path, path)  # 写完再替换，避免其他进程读到半个文件
+
+
+def load_table(board, cache_dir=None, max_bytes=None, progress=None, stats=None, on_level=None):
+    # 打开布局对应的距离表，不存在时先建立；progress、stats、on_level 只在建表时使用，见 build_table
+    path = os.path.join(cache_dir or CACHE_DIR, f"{layout_key(board)}.dist")
+    table = _open_tables.get(path)
+    if table is None:
+        if not os.path.exists(path):
+            build_table(board, path, max_bytes, progress, stats, on_level)
+        table = _open_tables[path] = DistanceTable(board, path)
+    return table
@@ -1,10 +1,16 @@
 import pygame
 import sys
 import random
-from collections import deque
+from solver import BFS, IDASTAR, UNIT, Board, MemoryLimitExceeded, SearchTimeout, solve, unit_steps
+from distance_table import load_table
+from background import BackgroundSolver
+from stats_overlay import draw_stats_overlay, overlay_rect
+from render import DirtyScreen, next_events, open_window
+from surface_cache import SurfaceCache
+from playback import Playback
+from occupancy import OccupancyGrid
 
-# 初始化Pygame
-pygame.init()
+# 导入本模块不会初始化 pygame 或打开窗口，这些都在 main() 中按需进行
 
 # 定义颜色
 WHITE = (255, 255, 255)
@@ -17,8 +23,21 @@ GOLD = (255, 215, 0)
 WIDTH, HEIGHT = 600, 600
 GRID_SIZE = 6
 CELL_SIZE = WIDTH // GRID_SIZE
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("滑块拼图游戏")
+SOLVER_MEMORY_LIMIT = 512 * 1024 * 1024  # 求解器内存上限（字节）
+SOLVER_STRATEGY = BFS  # 搜索策略：'bfs'、'astar'、'bidirectional'、'vector'（需要 numpy）或 'idastar'（内存固定，适合大棋盘）
+SOLVER_MOVE_MODEL = UNIT  # 'unit' 每步移动一格；'slide' 每步滑动任意格，搜索层数更少
+IDASTAR_TIME_LIMIT = 60  # IDA* 最多搜索的秒数：它要很多轮才能证明无解（置换表装不下所有状态时永远证明不了），超时就放弃
+USE_DISTANCE_TABLE = False  # 首次求解时建立整个状态空间的距离表并缓存到磁盘，之后的提示只需查表
+SHOW_SOLVER_STATS = False  # 显示求解器逐层统计的浮层，游戏中按 's' 键切换
+IDLE_RENDERING = True  # 空闲时阻塞等待事件，只重绘发生变化的区域；False 时每帧整屏重绘
+STATUS_RECT = pygame.Rect(0, HEIGHT - 30, WIDTH, 30)  # 求解进度文字所在的区域
+PLAYBACK_MOVE_TIME = 0.5  # 回放解法时 1 倍速下每一步的秒数
+screen = None  # 由 init_display() 创建
+
+def init_display(headless=False):
+    global screen
+    screen = open_window((WIDTH, HEIGHT), "滑块拼图游戏", headless)
+    return screen
 
 class Block:
     def __init__(self, x, y, color, width, height, orientation):
@@ -30,6 +49,7 @@ class Block:
         self.orientation = orientation
         self.rect = pygame.Rect(x * CELL_SIZE, y * CELL_SIZE, width * CELL_SIZE, height * CELL_SIZE)
         self.drag_offset = (0, 0)
+        self.grid = None  # 登记了这个方块的 OccupancyGrid
 
     def draw(self):
         pygame.draw.rect(screen, self.color, self.rect)
@@ -43,25 +63,29 @@ class Block:
             self.y = new_y
             self.rect.x = self.x * CELL_SIZE
             self.rect.y = self.y * CELL_SIZE
+            if self.grid is not None:
+                self.grid.update(self)
 
-    def drag(self, mouse_x, mouse_y, all_blocks):
+    def drag(self, mouse_x, mouse_y):
+        # 鼠标移动很快时一次跨过多格：停在这个方向上能到达的最远空格，而不是整个拒绝
         new_x = (mouse_x - self.drag_offset[0]) / CELL_SIZE
         new_y = (mouse_y - self.drag_offset[1]) / CELL_SIZE
         
         if self.orientation == 'horizontal':
             dx = new_x - self.x
             if abs(dx) >= 0.5:  # 增加移动阈值
-                move_amount = round(dx)
-                if is_valid_move(self, move_amount, 0, all_blocks):
-                    self.x += move_amount
-                    self.rect.x = int(self.x * CELL_SIZE)
+                low, high = self.grid.free_range(self, self.x, self.y, True)
+                self.set_state((min(max(self.x + round(dx), low), high), self.y))
         else:  # vertical
             dy = new_y - self.y
             if abs(dy) >= 0.5:  # 增加移动阈值
-                move_amount = round(dy)
-                if is_valid_move(self, 0, move_amount, all_blocks):
-                    self.y += move_amount
-                    self.rect.y = int(self.y * CELL_SIZE)
+                low, high = self.grid.free_range(self, self.x, self.y, False)
+                self.set_state((self.x, min(max(self.y + round(dy), low), high)))
+
+    def set_tween(self, fx, fy):
+        # 回放动画中的绘制偏移（格），格子坐标 x, y 不变
+        self.rect.x = round((self.x + fx) * CELL_SIZE)
+        self.rect.y = round((self.y + fy) * CELL_SIZE)
 
     def get_state(self):
         return (self.x, self.y)
@@ -70,6 +94,8 @@ class Block:
         self.x, self.y = state
         self.rect.x = self.x * CELL_SIZE
         self.rect.y = self.y * CELL_SIZE
+        if self.grid is not None:
+            self.grid.update(self)
 
 # 创建方块
 blocks = [
@@ -90,39 +116,25 @@ blocks = [
 # 在创建方块列表后，保存初始状态
 initial_block_states = [block.get_state() for block in blocks]
 
-def draw_grid():
+# 格子 -> 方块的索引，用于点击命中和拖动时的碰撞检测
+occupancy = OccupancyGrid(GRID_SIZE, GRID_SIZE, blocks)
+
+def draw_grid(surface):
     for x in range(0, WIDTH, CELL_SIZE):
-        pygame.draw.line(screen, BLACK, (x, 0), (x, HEIGHT))
+        pygame.draw.line(surface, BLACK, (x, 0), (x, HEIGHT))
     for y in range(0, HEIGHT, CELL_SIZE):
-        pygame.draw.line(screen, BLACK, (0, y), (WIDTH, y))
-
-def is_valid_move(block, dx, dy, all_blocks):
-    new_x = block.x + dx
-    new_y = block.y + dy
-    new_rect = pygame.Rect(int(new_x * CELL_SIZE), int(new_y * CELL_SIZE), 
-                           block.rect.width, block.rect.height)
-    if new_rect.left < 0 or new_rect.right > WIDTH or new_rect.top < 0 or new_rect.bottom > HEIGHT:
-        return False
-    for other_block in all_blocks:
-        if other_block != block and new_rect.colliderect(other_block.rect):
-            return False
-    return True
-
-def get_possible_moves(block, all_blocks):
-    moves = []
-    if block.orientation == 'horizontal':
-        for dx in [-1, 1]:
-            if is_valid_move(block, dx, 0, all_blocks):
-                moves.append((dx, 0))
-    else:
-        for dy in [-1, 1]:
-            if is_valid_move(block, 0, dy, all_blocks):
-                moves.append((0, dy))
-    return moves
+        pygame.draw.line(surface, BLACK, (0, y), (WIDTH, y))
+
+def draw_background(surface):
+    surface.fill(WHITE)
+    draw_grid(surface)
+
+# 背景只画一次，之后每帧直接 blit
+surfaces = SurfaceCache(draw_background)
 
 def is_solved(blocks):
     gold_block = next(block for block in blocks if block.color == GOLD)
-    return gold_block.x == 4 and gold_block.y == 2
+    return gold_block.x == GRID_SIZE - gold_block.width
 
 def get_state(blocks):
     return tuple(block.get_state() for block in blocks)
@@ -131,142 +143,169 @@ def set_state(blocks, state):
     for block, block_state in zip(blocks, state):
         block.set_state(block_state)
 
-def solve_puzzle(blocks):
-    initial_state = get_state(blocks)
-    queue = deque([(initial_state, [])])
-    visited = set([initial_state])
-
-    while queue:
-        current_state, path = queue.popleft()
-
-        if is_solved_state(current_state):
-            return path
-
-        for i, block_state in enumerate(current_state):
-            block = blocks[i]
-            for dx, dy in get_possible_moves_state(block_state, block.orientation, block.width, block.height, current_state):
-                new_block_state = (block_state[0] + dx, block_state[1] + dy)
-                new_state = list(current_state)
-                new_state[i] = new_block_state
-                new_state = tuple(new_state)
-                
-                if new_state not in visited:
-                    new_path = path + [(i, dx, dy)]
-                    queue.append((new_state, new_path))
-                    visited.add(new_state)
-
-    return None  # 如果没有找到解决方案
-
-def is_solved_state(state):
-    gold_block_state = state[11]  # 假设金块是第12个方块（索引11）
-    return gold_block_state == (4, 2)
-
-def get_possible_moves_state(block_state, orientation, width, height, all_states):
-    moves = []
-    x, y = block_state
-    if orientation == 'horizontal':
-        for dx in [-1, 1]:
-            if is_valid_move_state((x+dx, y), block_state, orientation, width, height, all_states):
-                moves.append((dx, 0))
-    else:
-        for dy in [-1, 1]:
-            if is_valid_move_state((x, y+dy), block_state, orientation, width, height, all_states):
-                moves.append((0, dy))
-    return moves
-
-def is_valid_move_state(new_pos, old_pos, orientation, width, height, all_states):
-    x, y = new_pos
-    old_x, old_y = old_pos
-    if x < 0 or x + width > GRID_SIZE or y < 0 or y + height > GRID_SIZE:
-        return False
-    
-    # 检查新位置是否与其他方块重叠
-    for i, state in enumerate(all_states):
-        if state == old_pos:  # 跳过当前方块
-            continue
-        other_x, other_y = state
-        other_block = blocks[i]
-        if (x < other_x + other_block.width and x + width > other_x and
-            y < other_y + other_block.height and y + height > other_y):
-            return False
-    return True
-
-def apply_solution(solution):
-    if solution:
-        for block_index, dx, dy in solution:
-            block = blocks[block_index]
-            start_x, start_y = block.rect.x, block.rect.y
-            end_x, end_y = start_x + dx * CELL_SIZE, start_y + dy * CELL_SIZE
-            
-            # 添加简单的动画效果
-            for step in range(1, 11):  # 将移动分成10个步骤
-                block.rect.x = start_x + (end_x - start_x) * step // 10
-                block.rect.y = start_y + (end_y - start_y) * step // 10
-                
-                # 重新绘制屏幕
-                screen.fill(WHITE)
-                draw_grid()
-                for b in blocks:
-                    b.draw()
-                pygame.display.flip()
-                pygame.time.wait(50)  # 每一小步等待50毫秒
-            
-            block.x = block.rect.x // CELL_SIZE
-            block.y = block.rect.y // CELL_SIZE
-    else:
-        print("没有找到解决方案")
+def make_board(blocks, move_model=UNIT, max_bytes=None):
+    # 把方块列表转换为位棋盘，金块右边缘到达右边界即为解开
+    specs = [(block.x, block.y, block.width, block.height, block.orientation) for block in blocks]
+    gold_index = next(i for i, block in enumerate(blocks) if block.color == GOLD)
+    goal_positions = [(GRID_SIZE - blocks[gold_index].width, y) for y in range(GRID_SIZE)]
+    return Board(specs, gold_index, goal_positions, GRID_SIZE, move_model, max_bytes)
+
+def solve_puzzle(blocks, move_model=None, progress=None, stats=None, on_level=None):
+    # 返回逐格的移动 [(方块序号, dx, dy), ...]
+    try:
+        board = make_board(blocks, move_model or SOLVER_MOVE_MODEL, SOLVER_MEMORY_LIMIT)
+        if USE_DISTANCE_TABLE:
+            table = load_table(board, max_bytes=SOLVER_MEMORY_LIMIT, progress=progress, stats=stats, on_level=on_level)
+            path = table.solution(board.pack(get_state(blocks)))
+        else:
+            start = board.pack(get_state(blocks))
+            time_limit = IDASTAR_TIME_LIMIT if SOLVER_STRATEGY == IDASTAR else None
+            try:
+                path = solve(board, start, SOLVER_MEMORY_LIMIT, SOLVER_STRATEGY, time_limit,
+                             stats=stats, progress=progress, on_level=on_level)
+            except MemoryLimitExceeded as e:
+                # 访问集合超出上限（大棋盘）时改用内存固定的 IDA*，多花时间但不会超出上限
+                if SOLVER_STRATEGY == IDASTAR:
+                    raise
+                print(e)
+                path = solve(board, start, SOLVER_MEMORY_LIMIT, IDASTAR, IDASTAR_TIME_LIMIT,
+                             stats=stats, progress=progress, on_level=on_level)
+    except MemoryLimitExceeded as e:
+        print(e)
+        return None
+    except SearchTimeout:
+        print(f"IDA* 搜索了 {IDASTAR_TIME_LIMIT} 秒仍没有找到解，放弃（布局可能无解）")
+        return None
+    return None if path is None else unit_steps(path)
+
+def draw_board(surface):
+    surface.blit(surfaces.background(surface.get_size()), (0, 0))
+    for block in blocks:
+        block.draw()
+
+def make_playback(solution):
+    # 逐格的移动 [(方块序号, dx, dy), ...] -> 回放，由主循环按帧推进
+    return Playback([(blocks[i], dx, dy) for i, dx, dy in solution], PLAYBACK_MOVE_TIME)
 
 def reset_game():
     for block, initial_state in zip(blocks, initial_block_states):
         block.set_state(initial_state)
 
-selected_block = None
-solving = False
-
-# 游戏主循环
-running = True
-clock = pygame.time.Clock()
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        elif event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_h:  # 按下 'h' 键
-                solution = solve_puzzle(blocks)
-                apply_solution(solution)
-            elif event.key == pygame.K_r:  # 按下 'r' 键
-                reset_game()
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            if event.button == 1:  # 左键点击
-                for block in blocks:
-                    if block.rect.collidepoint(event.pos):
+def main(headless=False):
+    if headless:
+        # 无窗口运行：只求解并输出逐格的移动
+        steps = solve_puzzle(blocks)
+        print("没有找到解决方案" if steps is None else f"{len(steps)} 步: {steps}")
+        return
+    if screen is None:
+        init_display()
+
+    selected_block = None
+    playback = None  # 正在回放的解法
+    background_solver = BackgroundSolver()
+    status_font = pygame.font.Font(None, 28)
+    stats_font = pygame.font.Font(None, 20)
+    show_stats = SHOW_SOLVER_STATS
+    renderer = DirtyScreen(screen, IDLE_RENDERING)
+
+    def draw_frame(surface):
+        # 返回求解、回放过程中每帧都在变化的区域
+        draw_board(surface)
+        live = []
+        if background_solver.running:
+            status = f"Solving... {background_solver.states} states, {background_solver.elapsed():.1f}s (Esc to cancel)"
+            surface.blit(surfaces.text(status_font, status, BLACK, WHITE), (10, HEIGHT - 30))
+            live.append(STATUS_RECT)
+        elif playback is not None:
+            surface.blit(surfaces.text(stats_font, playback.status(), BLACK, WHITE), (10, HEIGHT - 24))
+            live.append(STATUS_RECT)
+        if show_stats and (background_solver.running or background_solver.levels):
+            draw_stats_overlay(surface, stats_font, background_solver, surfaces=surfaces)
+            if background_solver.running:
+                live.append(overlay_rect(stats_font))
+        return live
+
+    # 游戏主循环
+    running = True
+    clock = pygame.time.Clock()
+    while running:
+        # 空闲时阻塞等待事件，求解或回放时按帧率刷新
+        active = background_solver.pending or (playback is not None and playback.playing)
+        for event in next_events(clock, active or not IDLE_RENDERING):
+            renderer.handle_event(event)
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_h and playback is None:  # 按下 'h' 键，在后台求解
+                    selected_block = None  # 结束拖动，求解和回放时鼠标不能再移动方块
+                    background_solver.start(solve_puzzle, blocks)
+                    renderer.invalidate(STATUS_RECT)
+                    renderer.invalidate(overlay_rect(stats_font))
+                elif event.key == pygame.K_ESCAPE:  # 按下 Esc 取消求解或停止回放
+                    background_solver.cancel()
+                    if playback is not None:
+                        playback.stop()
+                        playback = None
+                elif event.key == pygame.K_s:  # 按下 's' 键显示/隐藏求解统计
+                    show_stats = not show_stats
+                    renderer.invalidate(overlay_rect(stats_font))
+                elif event.key == pygame.K_r:  # 按下 'r' 键
+                    background_solver.cancel()
+                    if playback is not None:
+                        playback.stop()
+                        playback = None
+                    reset_game()
+                elif playback is not None:
+                    # 回放控制：空格暂停/继续，'n' 或右方向键走一步，End 直接到最后，+/- 调整速度
+                    if event.key == pygame.K_SPACE:
+                        playback.toggle_pause()
+                    elif event.key in (pygame.K_n, pygame.K_RIGHT):
+                        playback.step()
+                    elif event.key == pygame.K_END:
+                        playback.skip_to_end()
+                    elif event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS):
+                        playback.faster()
+                    elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                        playback.slower()
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                # 左键点击，求解或回放中不能拖动
+                if event.button == 1 and not background_solver.running and playback is None:
+                    block = occupancy.block_at(event.pos[0] // CELL_SIZE, event.pos[1] // CELL_SIZE)
+                    if block is not None:
                         selected_block = block
                         mouse_x, mouse_y = event.pos
                         offset_x = mouse_x - block.rect.x
                         offset_y = mouse_y - block.rect.y
                         block.drag_offset = (offset_x, offset_y)
-                        break
-        elif event.type == pygame.MOUSEBUTTONUP:
-            if event.button == 1:  # 左键释放
-                selected_block = None
-        elif event.type == pygame.MOUSEMOTION:
-            if selected_block:
-                selected_block.drag(event.pos[0], event.pos[1], blocks)
-
-    # 绘制背景
-    screen.fill(WHITE)
-    
-    # 绘制网格
-    draw_grid()
-    
-    # 绘制所有方块
-    for block in blocks:
-        block.draw()
-    
-    # 更新显示
-    pygame.display.flip()
-
-    clock.tick(60)  # 限制帧率为60FPS
-
-pygame.quit()
-sys.exit()
+            elif event.type == pygame.MOUSEBUTTONUP:
+                if event.button == 1:  # 左键释放
+                    selected_block = None
+            elif event.type == pygame.MOUSEMOTION:
+                if selected_block and not background_solver.running and playback is None:
+                    selected_block.drag(event.pos[0], event.pos[1])
+
+        # 后台求解完成后开始回放解法
+        if background_solver.poll():
+            if background_solver.error is not None:
+                print(f"求解出错: {background_solver.error}")
+            elif background_solver.result:
+                playback = make_playback(background_solver.result)
+            else:
+                print("没有找到解决方案")
+
+        # 按上一帧经过的时间推进回放
+        if playback is not None:
+            playback.update(clock.get_time() / 1000)
+            if playback.done:
+                playback = None
+
+        # 只重绘位置发生变化的方块和求解进度
+        for block in blocks:
+            renderer.track(block, block.rect)
+        renderer.present(draw_frame)
+
+    pygame.quit()
+    sys.exit()
+
+if __name__ == '__main__':
+    main(headless='--headless' in sys.argv[1:])
@@ -0,0 +1,60 @@
+from math import ceil, floor
+
+# 格子 -> 方块的占用索引：点击命中、碰撞检测和拖动范围只需查看相关的几个格子，不用遍历所有方块。
+# 方块需要有 x, y, width, height（以格为单位）；方块的格子坐标改变后调用 update()（Block 的 move/set_state 等会自动调用）。
+
+
+class OccupancyGrid:
+    def __init__(self, columns, rows, blocks=()):
+        self.columns = columns
+        self.rows = rows
+        self.cells = [None] * (columns * rows)  # 按行存放，每格是占用它的方块或 None
+        self.placed = {}  # 方块 -> 登记时的格子坐标
+        for block in blocks:
+            self.add(block)
+
+    def add(self, block):
+        block.grid = self
+        self.placed[block] = (block.x, block.y)
+        self._fill(block, block.x, block.y, None, block)
+
+    def update(self, block):
+        x, y = self.placed[block]
+        if (x, y) != (block.x, block.y):
+            # 只清除仍属于这个方块的格子：逐个恢复布局时，别的方块可能已经先移进来了
+            self._fill(block, x, y, block, None)
+            self.placed[block] = (block.x, block.y)
+            self._fill(block, block.x, block.y, None, block)
+
+    def block_at(self, column, row):
+        if 0 <= column < self.columns and 0 <= row < self.rows:
+            return self.cells[row * self.columns + column]
+        return None
+
+    def free_range(self, block, x, y, horizontal):
+        # 方块从 (x, y) 沿水平或竖直方向不越过其他方块能到达的左上角坐标范围 (lo, hi)；
+        # x, y 可以是拖动中的小数坐标，方块自己登记的格子视为空
+        if horizontal:
+            lines = range(floor(y), ceil(y + block.height))
+            start, end, limit = floor(x), ceil(x + block.width), self.columns
+        else:
+            lines = range(floor(x), ceil(x + block.width))
+            start, end, limit = floor(y), ceil(y + block.height), self.rows
+        while start > 0 and self._line_free(block, start - 1, lines, horizontal):
+            start -= 1
+        while end < limit and self._line_free(block, end, lines, horizontal):
+            end += 1
+        return start, end - (block.width if horizontal else block.height)
+
+    def _line_free(self, block, position, lines, horizontal):
+        for line in lines:
+            cell = self.cells[line * self.columns + position] if horizontal else self.cells[position * self.columns + line]
+            if cell is not None and cell is not block:
+                return False
+        return True
+
+    def _fill(self, block, x, y, old, new):
+        for row in range(y, y + block.height):
+            for index in range(row * self.columns + x, row * self.columns + x + block.width):
+                if old is None or self.cells[index] is old:
+                    self.cells[index] = new
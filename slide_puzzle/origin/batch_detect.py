@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool, util
+
+from find_img import DetectionDebug, detect_blocks, detect_blocks_pyramid, image_error, load_image, preprocess
+
+# 批量识别截图：多进程识别方块布局，按输入顺序以 JSON Lines 输出，每行是 {"index", "id", "status", "blocks", ...}，
+# 可以直接作为 batch_solve.py 的输入。调试输出默认关闭：-v 把识别过程打印到标准错误，
+# --mask-dir 把每张截图各颜色的掩码写成 <截图名>_<颜色>_mask.png（在各进程的后台线程中写盘）。
+# 高分辨率截图可以加 --pyramid 先在缩小的图像上识别，--budget 限制每张截图的识别时间。
+#
+# 用法: python batch_detect.py screenshots/ -o layouts.jsonl -j 8
+#       find archive -name '*.png' | python batch_detect.py > layouts.jsonl
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+MASK_SUFFIX = '_mask.png'  # 调试掩码，列目录时跳过
+
+_debug = None  # 工作进程的 DetectionDebug
+_pyramid = False
+_budget = None
+
+
+def init_worker(verbose, mask_dir, pyramid=False, budget=None):
+    global _debug, _pyramid, _budget
+    _pyramid, _budget = pyramid, budget
+    if verbose or mask_dir:
+        _debug = DetectionDebug(verbose, mask_dir, '{stem}_{color}_mask.png', sys.stderr)
+        # 进程正常退出前等待掩码写完
+        util.Finalize(_debug, _debug.close, exitpriority=10)
+
+
+def detect_screenshot(task):
+    index, path = task
+    result = {'index': index, 'id': path}
+    started = time.perf_counter()
+    img = load_image(path)
+    if img is None:
+        result['status'] = 'error'
+        result['error'] = image_error(path)
+    elif _pyramid:
+        result['status'] = 'ok'
+        result['blocks'] = detect_blocks_pyramid(img, _debug, path, _budget)
+    else:
+        result['status'] = 'ok'
+        result['blocks'] = detect_blocks(preprocess(img), _debug, path)
+    result['wall_time'] = round(time.perf_counter() - started, 6)
+    return result
+
+
+def list_screenshots(inputs):
+    # 目录按文件名排序展开（不递归），文件原样保留；没有参数时从标准输入逐行读取路径
+    if not inputs:
+        inputs = (line.strip() for line in sys.stdin)
+    for path in inputs:
+        if not path:
+            continue
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(IMAGE_EXTENSIONS) and not name.endswith(MASK_SUFFIX):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量识别截图中的方块布局")
+    parser.add_argument('inputs', nargs='*', help="截图文件或目录，默认从标准输入逐行读取截图路径")
+    parser.add_argument('-o', '--output', help="输出文件，默认写到标准输出")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help="工作进程数")
+    parser.add_argument('-v', '--verbose', action='store_true', help="把识别过程打印到标准错误")
+    parser.add_argument('--mask-dir', help="把各颜色的掩码写到这个目录，用于调试")
+    parser.add_argument('--pyramid', action='store_true', help="金字塔模式：先在缩小的图像上识别，适合高分辨率截图")
+    parser.add_argument('--budget', type=float, help="金字塔模式下每张截图的时间预算（秒）")
+    args = parser.parse_args(argv)
+
+    if args.mask_dir:
+        os.makedirs(args.mask_dir, exist_ok=True)
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        pool = Pool(args.jobs, init_worker, (args.verbose, args.mask_dir, args.pyramid, args.budget))
+        try:
+            # imap 按输入顺序逐个返回结果，不必等整批识别完
+            for result in pool.imap(detect_screenshot, enumerate(list_screenshots(args.inputs)), chunksize=1):
+                output.write(json.dumps(result, ensure_ascii=False) + '\n')
+                output.flush()
+            # 正常结束时让工作进程自己退出，后台线程里的掩码才能写完
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from find_img import (TARGET_COLORS, assemble_blocks, clean_mask, color_mask, detect_blocks_pyramid, image_error,
+                      load_image, positions_from_mask, preprocess)
+
+# 与求解器基准测试共用 git 信息的获取
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmark import git_commit
+
+# 截图识别基准测试：对带真实布局的截图（synth_screenshots.py 生成的 manifest.jsonl）逐张识别，
+# 记录各阶段耗时和每秒识别的截图数，并按方块统计 precision / recall：识别出的方块与真实布局中的方块
+# (x, y, 颜色, 宽, 高) 完全相同才算正确。结果写成 JSON，便于在修改识别算法前后比较。
+#
+# 用法: python synth_screenshots.py -n 200 && python detect_benchmark.py -o detect.json
+#       python detect_benchmark.py --pyramid -o pyramid.json --compare detect.json
+
+MANIFEST_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             'cache', 'synthetic', 'manifest.jsonl')
+STAGES = ('decode', 'preprocess', 'mask', 'positions', 'assemble')
+PYRAMID_STAGES = ('decode', 'pyramid')
+COLORS = ('GREEN', 'RED', 'GOLD')
+
+
+def read_manifest(path):
+    # 截图路径相对于 manifest 所在目录
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    for entry in entries:
+        entry['path'] = os.path.join(base, entry['image'])
+    return entries
+
+
+def detect_timed(path, timings, pyramid=False, budget=None):
+    # 与 find_img.process_image 相同的识别流程，各阶段分别计时（秒），读取失败返回 None
+    started = time.perf_counter()
+    img = load_image(path)
+    timings['decode'] = time.perf_counter() - started
+    if img is None:
+        return None
+    if pyramid:
+        started = time.perf_counter()
+        blocks = detect_blocks_pyramid(img, budget=budget)
+        timings['pyramid'] = time.perf_counter() - started
+        return blocks
+
+    started = time.perf_counter()
+    hsv = preprocess(img)
+    timings['preprocess'] = time.perf_counter() - started
+    started = time.perf_counter()
+    masks = [clean_mask(color_mask(hsv, color)) for color in TARGET_COLORS]
+    timings['mask'] = time.perf_counter() - started
+    started = time.perf_counter()
+    positions = [positions_from_mask(mask, color) for mask, color in zip(masks, TARGET_COLORS)]
+    timings['positions'] = time.perf_counter() - started
+    started = time.perf_counter()
+    blocks = assemble_blocks(*positions)
+    timings['assemble'] = time.perf_counter() - started
+    return blocks
+
+
+def score(detected, expected):
+    # 按颜色统计 (正确, 识别出的, 真实的) 方块数；方向由颜色决定，不参与比较
+    detected = {tuple(block[:5]) for block in detected}
+    expected = {tuple(block[:5]) for block in expected}
+    return {color: (sum(block[2] == color for block in detected & expected),
+                    sum(block[2] == color for block in detected),
+                    sum(block[2] == color for block in expected)) for color in COLORS}
+
+
+def ratio(numerator, denominator):
+    return round(numerator / denominator, 4) if denominator else None
+
+
+def summarize(results, stages):
+    ok = [result for result in results if result['status'] != 'error']
+    total_time = sum(result['wall_time'] for result in ok)
+    summary = {
+        'images': len(results),
+        'errors': len(results) - len(ok),
+        'exact': sum(result['status'] == 'exact' for result in results),
+        'images_per_sec': round(len(ok) / total_time, 2) if total_time else None,
+        'stage_ms': {stage: round(sum(result['stages'][stage] for result in ok) / len(ok) * 1000, 3) if ok else None
+                     for stage in stages},
+    }
+    for color in COLORS + ('ALL',):
+        counts = [result['counts'][color] for result in ok] if color != 'ALL' else \
+            [[sum(values) for values in zip(*result['counts'].values())] for result in ok]
+        correct, detected, expected = (sum(values) for values in zip(*counts)) if counts else (0, 0, 0)
+        summary[color.lower()] = {'precision': ratio(correct, detected), 'recall': ratio(correct, expected)}
+    return summary
+
+
+def print_summary(summary, stages):
+    print(f"\n截图 {summary['images']} 张，错误 {summary['errors']}，布局完全正确 {summary['exact']}，"
+          f"每秒 {summary['images_per_sec']} 张")
+    print("各阶段平均耗时: " + "  ".join(f"{stage} {summary['stage_ms'][stage]}ms" for stage in stages))
+    for color in COLORS + ('ALL',):
+        values = summary[color.lower()]
+        print(f"  {color:<6} precision {values['precision']}  recall {values['recall']}")
+
+
+def compare(report, baseline_path):
+    # 与之前的结果比较，返回原来正确、现在不正确的截图数
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    old_results = {result['id']: result for result in baseline['results']}
+    regressed = 0
+    print(f"\n与 {baseline_path} 比较:")
+    for result in report['results']:
+        old = old_results.get(result['id'])
+        if old is not None and old['status'] == 'exact' and result['status'] != 'exact':
+            regressed += 1
+            print(f"  {result['id']:<12} 变为 {result['status']}")
+    old_summary, new_summary = baseline['summary'], report['summary']
+    if old_summary['images_per_sec'] and new_summary['images_per_sec']:
+        print(f"  每秒截图数 x{new_summary['images_per_sec'] / old_summary['images_per_sec']:.2f}")
+    for color in COLORS + ('ALL',):
+        old, new = old_summary[color.lower()], new_summary[color.lower()]
+        print(f"  {color:<6} precision {old['precision']} -> {new['precision']}  recall {old['recall']} -> {new['recall']}")
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="截图识别的准确率和速度基准测试")
+    parser.add_argument('manifest', nargs='?', default=MANIFEST_PATH, help="带真实布局的截图清单（JSON Lines）")
+    parser.add_argument('-o', '--output', help="结果输出文件（JSON）")
+    parser.add_argument('--compare', help="与之前输出的结果文件比较")
+    parser.add_argument('--repeat', type=int, default=1, help="每张截图识别的次数，取最快一次")
+    parser.add_argument('--pyramid', action='store_true', help="使用金字塔模式识别")
+    parser.add_argument('--budget', type=float, help="金字塔模式的时间预算（秒）")
+    parser.add_argument('-v', '--verbose', action='store_true', help="逐张打印结果")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.manifest):
+        print(f"错误：文件 '{args.manifest}' 不存在，先用 synth_screenshots.py 生成合成截图。", file=sys.stderr)
+        return 1
+    stages = PYRAMID_STAGES if args.pyramid else STAGES
+    results = []
+    for entry in read_manifest(args.manifest):
+        best, blocks = None, None
+        for _ in range(args.repeat):
+            timings = {}
+            blocks = detect_timed(entry['path'], timings, args.pyramid, args.budget)
+            if best is None or sum(timings.values()) < sum(best.values()):
+                best = timings
+        result = {'id': entry['id'], 'wall_time': round(sum(best.values()), 6),
+                  'stages': {stage: round(best.get(stage, 0), 6) for stage in stages}}
+        if blocks is None:
+            result['status'] = 'error'
+            result['error'] = image_error(entry['path'])
+        else:
+            result['counts'] = score(blocks, entry['blocks'])
+            correct, detected, expected = (sum(values) for values in zip(*result['counts'].values()))
+            result['status'] = 'exact' if correct == detected == expected else 'wrong'
+        results.append(result)
+        if args.verbose:
+            print(f"{entry['id']:<12} {result['status']:<6} {result['wall_time'] * 1000:8.1f}ms  "
+                  f"{entry.get('cell_size', '')}")
+
+    commit, dirty = git_commit()
+    report = {
+        'commit': commit,
+        'dirty': dirty,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'manifest': args.manifest,
+        'pyramid': args.pyramid,
+        'budget': args.budget,
+        'repeat': args.repeat,
+        'summary': summarize(results, stages),
+        'results': results,
+    }
+    print_summary(report['summary'], stages)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    failed = report['summary']['errors']
+    if args.compare:
+        failed += compare(report, args.compare)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,73 +1,167 @@
+import argparse
 import cv2
 import numpy as np
 import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-def find_block_positions(image_path, target_color, grid_size=6, exclude_color=None):
-    # 检查文件是否存在
+IMG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'img')  # 示例截图和调试掩码所在目录
+SAMPLE_IMAGE = os.path.join(IMG_DIR, 'sekuai.png')
+# 三种方块的 HSV 颜色范围
+GREEN_TARGET_COLOR_HSV = ([40, 150, 100], [80, 255, 255])
+RED_TARGET_COLOR_HSV = ([0, 150, 150], [10, 255, 255])
+GOLD_TARGET_COLOR_HSV = ([20, 100, 100], [30, 255, 255])
+TARGET_COLORS = (GREEN_TARGET_COLOR_HSV, RED_TARGET_COLOR_HSV, GOLD_TARGET_COLOR_HSV)
+MAX_PENDING_MASKS = 16  # 最多积压多少张未写完的掩码，磁盘跟不上时识别等一等，内存不会无限增长
+HIT_PERCENTAGE = 10  # 格子的命中像素百分比达到这个值才算方块占据了这一格
+GOLD_HIT_PERCENTAGE = 3  # 金色方块的颜色较浅，超过这个值就算
+EDGE_PERCENTAGE = 49  # 边缘窄条的命中百分比低于这个值说明方块在这里有边界
+MASK_RADIUS = 6  # 一个像素能影响到的掩码范围：5x5 高斯模糊 2 + 开运算 2 + 闭运算 2
+PYRAMID_CELL_SIZE = 128  # 金字塔模式先把截图缩小到每格约这么多像素做粗识别，太小时方块之间的缝隙会被抹掉
+PYRAMID_MARGIN = 0.5  # 粗识别的命中百分比达到判定阈值的 (1 - 这个比例) 的格子，回到原分辨率计算掩码
+
+class DetectionDebug:
+    # 识别过程的调试输出，默认都关闭，需要时显式传给 process_image：
+    # verbose 时把识别过程（命中的格子、轮廓数等）打印到 stream（默认标准输出）；
+    # mask_dir 不为 None 时把每种颜色的掩码写成 PNG，文件名由 mask_name 按截图名 {stem} 和颜色 {color} 生成。
+    # 掩码在后台线程编码和写盘，识别不用等磁盘；close() 等待所有写入完成
+    def __init__(self, verbose=False, mask_dir=None, mask_name='{color}_mask.png', stream=None):
+        self.verbose = verbose
+        self.mask_dir = mask_dir
+        self.mask_name = mask_name
+        self.stream = stream
+        self._writer = None
+        self._pending = []
+
+    def log(self, message):
+        if self.verbose:
+            print(message, file=self.stream or sys.stdout)
+
+    def save_mask(self, image_path, color, mask):
+        if self.mask_dir is None:
+            return
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1)
+        stem = os.path.splitext(os.path.basename(image_path or ''))[0]
+        path = os.path.join(self.mask_dir, self.mask_name.format(stem=stem, color=color))
+        self._pending = [future for future in self._pending if not future.done()]
+        if len(self._pending) >= MAX_PENDING_MASKS:
+            self._pending.pop(0).result()
+        # 掩码数组之后不会再被修改（形态学操作返回新数组），可以直接交给写盘线程
+        self._pending.append(self._writer.submit(cv2.imwrite, path, mask))
+
+    def close(self):
+        for future in self._pending:
+            future.result()
+        self._pending = []
+        if self._writer is not None:
+            self._writer.shutdown()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def load_image(image_path):
+    # 读取截图，返回 BGR 图像，读取失败返回 None
+    # 检查文件是否存在（不存在时 OpenCV 还会打印警告）
     if not os.path.exists(image_path):
-        print(f"错误：文件 '{image_path}' 不存在。")
         return None
 
     # 读取图像
-    img = cv2.imread(image_path)
-    
+    return cv2.imread(image_path)
+
+def preprocess(img):
+    # 添加图像预处理步骤
+    img = cv2.GaussianBlur(img, (5, 5), 0)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+
+def load_hsv(image_path):
+    # 读取截图并做预处理，返回 HSV 图像；多种颜色共用同一份，不必每种颜色各读一次。读取失败返回 None
+    img = load_image(image_path)
+
     # 检查图像是否成功加载
     if img is None:
-        print(f"错误：无法加载图像 '{image_path}'。")
         return None
-    # 图像的宽度和高度
-    width = img.shape[1]
-    height = img.shape[0]
+    return preprocess(img)
+
+def image_error(image_path):
+    # load_hsv 读取失败的原因
+    if not os.path.exists(image_path):
+        return f"错误：文件 '{image_path}' 不存在。"
+    return f"错误：无法加载图像 '{image_path}'。"
+
+def find_block_positions(image_path, target_color, grid_size=6, exclude_color=None, hsv=None, debug=None):
+    # hsv: load_hsv 的结果，传入时不再读取和预处理图像；debug: DetectionDebug，None 时不输出任何调试信息
+    if hsv is None:
+        hsv = load_hsv(image_path)
+        if hsv is None:
+            print(image_error(image_path))
+            return None
 
-    # 添加图像预处理步骤
-    img = cv2.GaussianBlur(img, (5, 5), 0)
-    hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-    # 根据目标颜色设置 HSV 范围
-    lower_color = np.array(target_color[0])
-    upper_color = np.array(target_color[1])
     # 创建掩码
-    mask = cv2.inRange(hsv, lower_color, upper_color)
-    # 只有当目标颜色是黄色时才调整HSV范围
-    if target_color == ([20, 100, 100], [30, 255, 255]):
-        # 调整黄色的HSV范围
-        lower_yellow = np.array([20, 100, 100])
-        upper_yellow = np.array([30, 255, 255])
-        
-        mask = cv2.inRange(hsv, lower_yellow, upper_yellow)
+    mask = color_mask(hsv, target_color)
 
     # 保存掩码图像
-    print(f"正在保存掩码: {target_color}")
+    if debug is not None:
+        debug.log(f"正在保存掩码: {target_color}")
+        if target_color == ([40, 150, 100], [80, 255, 255]):  # 绿色
+            debug.save_mask(image_path, 'green', mask)
+        elif target_color == ([0, 150, 150], [10, 255, 255]):  # 红色
+            debug.save_mask(image_path, 'red', mask)
+        elif target_color == ([20, 100, 100], [30, 255, 255]):  # 金色
+            debug.save_mask(image_path, 'gold', mask)
+
+    mask = clean_mask(mask)
+    if debug is not None and debug.verbose:
+        debug.log(f"图像尺寸: {hsv.shape}")
+    return positions_from_mask(mask, target_color, grid_size, debug)
+
+def color_mask(hsv, target_color):
+    # 根据目标颜色设置 HSV 范围
+    lower_color, upper_color = target_color
     # 微微增加浅绿色的范围
     if target_color == ([40, 150, 100], [80, 255, 255]):  # 绿色
-        lower_green = np.array([38, 140, 100])  # 稍微降低下限
-        upper_green = np.array([82, 255, 255])  # 稍微提高上限
-        mask = cv2.inRange(hsv, lower_green, upper_green)
-    if target_color == ([40, 150, 100], [80, 255, 255]):  # 绿色
-        cv2.imwrite('img/green_mask.png', mask)
-    elif target_color == ([0, 150, 150], [10, 255, 255]):  # 红色
-        cv2.imwrite('img/red_mask.png', mask)
-    elif target_color == ([20, 100, 100], [30, 255, 255]):  # 金色
-        cv2.imwrite('img/gold_mask.png', mask)
+        lower_color = [38, 140, 100]  # 稍微降低下限
+        upper_color = [82, 255, 255]  # 稍微提高上限
+    return cv2.inRange(hsv, np.array(lower_color), np.array(upper_color))
 
-    # 在find_block_positions函数中添加形态学操作
+def clean_mask(mask):
+    # 形态学开、闭运算去掉噪点和小孔
     kernel = np.ones((3,3), np.uint8)
     mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
-    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+    return cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+
+def positions_from_mask(mask, target_color, grid_size=6, debug=None):
+    # 从去噪后的掩码找出这种颜色的方块所占的格子
+    return positions_from_cells(mask, target_color, mask.shape[1] // grid_size, mask.shape[0] // grid_size, debug)
+
+def positions_from_cells(mask, target_color, cell_width, cell_height, debug=None):
+    # 同 positions_from_mask，但格子大小由调用方给出：mask 可以是从格子边界开始截取的一部分，结果按截取部分的格子编号
+    verbose = debug is not None and debug.verbose
 
     # 使用RETR_EXTERNAL和CHAIN_APPROX_TC89_L1来检测所有轮廓
     contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_TC89_L1)
 
-    print(f"图像尺寸: {img.shape}")
-    print(f"掩码中非零像素数: {np.count_nonzero(mask)}")
-    print(f"检测到的轮廓数: {len(contours)}")
+    if verbose:
+        debug.log(f"掩码中非零像素数: {np.count_nonzero(mask)}")
+        debug.log(f"检测到的轮廓数: {len(contours)}")
     
+    # 每格的命中百分比和边缘窄条统计对整张掩码一次算好（积分图），各个轮廓只需查表
+    integral = cv2.integral(cv2.threshold(mask, 0, 1, cv2.THRESH_BINARY)[1])
+    coverage, edges = coverage_grids(integral, cell_width, cell_height)
+    rects = [cv2.boundingRect(contour) for contour in contours]
+    return positions_from_grids(rects, cell_width, cell_height, coverage, edges, target_color, debug)
+
+def positions_from_grids(rects, cell_width, cell_height, coverage, edges, target_color, debug=None):
+    # 按各轮廓的外接矩形 rects 和逐格统计 coverage、edges（见 coverage_grids）找出方块所占的格子
+    verbose = debug is not None and debug.verbose
     blocks = []
-    cell_width = img.shape[1] // grid_size
-    cell_height = img.shape[0] // grid_size
-    
-    for contour in contours:
-        x, y, w, h = cv2.boundingRect(contour)
-        
+
+    for x, y, w, h in rects:
         # 计算网格索引
         grid_x = x // cell_width
         grid_y = y // cell_height
@@ -80,20 +174,17 @@ def find_block_positions(image_path, target_color, grid_size=6, exclude_color=No
         valid_cells = []
         for i in range(grid_w):
             for j in range(grid_h):
-                cell_x = (grid_x + i) * cell_width
-                cell_y = (grid_y + j) * cell_height
-                cell_mask = mask[cell_y:cell_y+cell_height, cell_x:cell_x+cell_width]
-                hit_pixels = np.count_nonzero(cell_mask)
-                total_pixels = cell_width * cell_height
-                hit_percentage = (hit_pixels / total_pixels) * 100
-                if hit_percentage >= 10:
+                hit_percentage = coverage[grid_y + j][grid_x + i]
+                if hit_percentage >= HIT_PERCENTAGE:
                     valid_cells.append((grid_x + i, grid_y + j))
-                    print(f"命中单元格: ({grid_x + i}, {grid_y + j}), 命中像素百分比: {hit_percentage:.2f}%")
+                    if verbose:
+                        debug.log(f"命中单元格: ({grid_x + i}, {grid_y + j}), 命中像素百分比: {hit_percentage:.2f}%")
                 else:
                     if target_color == ([20, 100, 100], [30, 255, 255]):  # 金色
-                        if hit_percentage > 3:
+                        if hit_percentage > GOLD_HIT_PERCENTAGE:
                             valid_cells.append((grid_x + i, grid_y + j))
-                            print(f"命中单元格: ({grid_x + i}, {grid_y + j}), 命中像素百分比: {hit_percentage:.2f}%")
+                            if verbose:
+                                debug.log(f"命中单元格: ({grid_x + i}, {grid_y + j}), 命中像素百分比: {hit_percentage:.2f}%")
         
         # 如果有有效的单元格,添加到块列表中
         if valid_cells:
@@ -104,10 +195,10 @@ def find_block_positions(image_path, target_color, grid_size=6, exclude_color=No
             
             if target_color != [(20, 100, 100), (30, 255, 255)]:
                 # 只为红色和绿色块检查边界
-                is_left_edge = check_edge(mask, min_x, min_y, max_y, cell_width, cell_height, is_horizontal=True, is_start=True)
-                is_right_edge = check_edge(mask, max_x, min_y, max_y, cell_width, cell_height, is_horizontal=True, is_start=False)
-                is_top_edge = check_edge(mask, min_x, min_y, max_x, cell_width, cell_height, is_horizontal=False, is_start=True)
-                is_bottom_edge = check_edge(mask, min_x, max_y, max_x, cell_width, cell_height, is_horizontal=False, is_start=False)
+                is_left_edge = check_edge(edges, min_x, min_y, max_y, is_horizontal=True, is_start=True)
+                is_right_edge = check_edge(edges, max_x, min_y, max_y, is_horizontal=True, is_start=False)
+                is_top_edge = check_edge(edges, min_x, min_y, max_x, is_horizontal=False, is_start=True)
+                is_bottom_edge = check_edge(edges, min_x, max_y, max_x, is_horizontal=False, is_start=False)
                 blocks.append((min_x, min_y, max_x - min_x + 1, max_y - min_y + 1, is_left_edge, is_right_edge, is_top_edge, is_bottom_edge))
             else:
                 # 金色块使用原来的处理方式
@@ -115,18 +206,51 @@ def find_block_positions(image_path, target_color, grid_size=6, exclude_color=No
 
     return blocks
 
-def check_edge(mask, x, y_start, y_end, cell_width, cell_height, is_horizontal, is_start):
+def cell_bands(size, cell, offset=0, length=None):
+    # 图像某一维上每个格子的像素区间 [起点, 终点)，边缘不足一格的部分也算一格；offset、length 取格子内的一段
+    starts = np.arange(-(-size // cell)) * cell + offset
+    return starts, starts + (cell if length is None else length)
+
+def band_sums(integral, rows, columns):
+    # 每个 行区间 x 列区间 的矩形（裁剪到图像内）中的命中像素数和面积，都是 [行][列] 矩阵
+    height, width = integral.shape[0] - 1, integral.shape[1] - 1
+    top, bottom = (np.minimum(edge, height) for edge in rows)
+    left, right = (np.minimum(edge, width) for edge in columns)
+    hits = (integral[np.ix_(bottom, right)] - integral[np.ix_(top, right)]
+            - integral[np.ix_(bottom, left)] + integral[np.ix_(top, left)])
+    return hits, np.outer(bottom - top, right - left)
+
+def coverage_grids(integral, cell_width, cell_height):
+    # 从积分图一次算出整张掩码的逐格统计：
+    # coverage[行][列] 是每格的命中百分比（按整格面积计算），
+    # edges[边] 是每格左、右、上、下宽 1/7 格的窄条的 (命中像素数, 面积) 矩阵，供 check_edge 按格相加
+    height, width = integral.shape[0] - 1, integral.shape[1] - 1
+    rows, columns = cell_bands(height, cell_height), cell_bands(width, cell_width)
+    check_width, check_height = cell_width // 7, cell_height // 7
+    coverage = band_sums(integral, rows, columns)[0] / (cell_width * cell_height) * 100
+    edges = {
+        'left': band_sums(integral, rows, cell_bands(width, cell_width, 0, check_width)),
+        'right': band_sums(integral, rows, cell_bands(width, cell_width, 6 * check_width, check_width)),
+        'top': band_sums(integral, cell_bands(height, cell_height, 0, check_height), columns),
+        'bottom': band_sums(integral, cell_bands(height, cell_height, 6 * check_height, check_height), columns),
+    }
+    # 转成列表，逐格查表比索引 numpy 数组快得多
+    return coverage.tolist(), {side: (hits.tolist(), sizes.tolist()) for side, (hits, sizes) in edges.items()}
+
+def check_edge(edges, x, y_start, y_end, is_horizontal, is_start):
+    return edge_percentage(edges, x, y_start, y_end, is_horizontal, is_start) < EDGE_PERCENTAGE
+
+def edge_percentage(edges, x, y_start, y_end, is_horizontal, is_start):
+    # 方块一条边上的窄条的命中像素百分比：水平方向是第 x 列格子的左/右窄条，跨 y_start..y_end 行；
+    # 竖直方向是第 y_start 行格子的上/下窄条，跨 x..y_end 列
     if is_horizontal:
-        check_width = cell_width // 7
-        check_x = x * cell_width + (0 if is_start else 6 * check_width)
-        check_area = mask[y_start*cell_height:(y_end+1)*cell_height, check_x:check_x+check_width]
+        hits, sizes = edges['left' if is_start else 'right']
+        cells = [(row, x) for row in range(y_start, y_end + 1)]
     else:
-        check_height = cell_height // 7
-        check_y = y_start * cell_height + (0 if is_start else 6 * check_height)
-        check_area = mask[check_y:check_y+check_height, x*cell_width:(y_end+1)*cell_width]
+        hits, sizes = edges['top' if is_start else 'bottom']
+        cells = [(y_start, column) for column in range(x, y_end + 1)]
     
-    hit_percentage = (np.count_nonzero(check_area) / check_area.size) * 100
-    return hit_percentage < 49
+    return (sum(hits[r][c] for r, c in cells) / sum(sizes[r][c] for r, c in cells)) * 100
 
 def merge_and_deduplicate_blocks(blocks, is_horizontal, is_gold=False):
     merged = []
@@ -158,17 +282,167 @@ def merge_and_deduplicate_blocks(blocks, is_horizontal, is_gold=False):
     
     return merged
 
-def process_image(image_path):
-    # 定义颜色范围
-    green_target_color_hsv = ([40, 150, 100], [80, 255, 255])
-    red_target_color_hsv = ([0, 150, 150], [10, 255, 255])
-    gold_target_color_hsv = ([20, 100, 100], [30, 255, 255])
+def process_image(image_path, debug=None, pyramid=False, budget=None):
+    # pyramid 为 True 时使用金字塔模式（见 detect_blocks_pyramid），budget 是它的时间预算（秒）
+    if pyramid:
+        img = load_image(image_path)
+        if img is None:
+            print(image_error(image_path))
+            return []
+        return detect_blocks_pyramid(img, debug, image_path, budget)
+
+    # 图像只读取和预处理一次，三种颜色的掩码都从同一份 HSV 图像计算
+    hsv = load_hsv(image_path)
+    if hsv is None:
+        print(image_error(image_path))
+        return []
+    return detect_blocks(hsv, debug, image_path)
 
+def detect_blocks(hsv, debug=None, image_path=None):
+    # 从预处理好的 HSV 图像识别所有方块；image_path 只用于给调试掩码命名
     # 查找方块位置
-    green_positions = find_block_positions(image_path, green_target_color_hsv)
-    red_positions = find_block_positions(image_path, red_target_color_hsv)
-    gold_positions = find_block_positions(image_path, gold_target_color_hsv)
+    green_positions = find_block_positions(image_path, GREEN_TARGET_COLOR_HSV, hsv=hsv, debug=debug)
+    red_positions = find_block_positions(image_path, RED_TARGET_COLOR_HSV, hsv=hsv, debug=debug)
+    gold_positions = find_block_positions(image_path, GOLD_TARGET_COLOR_HSV, hsv=hsv, debug=debug)
+    return assemble_blocks(green_positions, red_positions, gold_positions, debug)
 
+def cell_box(cells, cell_width, cell_height, width, height):
+    # 一组格子 {(行, 列)} 的外接范围在图像中的像素坐标 (left, top, right, bottom)，四边都在格子边界或图像边缘上
+    rows, columns = [row for row, _ in cells], [column for _, column in cells]
+    return (min(columns) * cell_width, min(rows) * cell_height,
+            min((max(columns) + 1) * cell_width, width), min((max(rows) + 1) * cell_height, height))
+
+def rect_cells(rect, cell_width, cell_height, rows, columns):
+    # 外接矩形外扩 1 像素后覆盖到的格子 {(行, 列)}：轮廓贴着格子边界时可能延伸进相邻的格子。rows、columns 是格子的行数和列数
+    x, y, w, h = rect
+    return {(row, column)
+            for row in range(max(y - 1, 0) // cell_height, min((y + h) // cell_height, rows - 1) + 1)
+            for column in range(max(x - 1, 0) // cell_width, min((x + w) // cell_width, columns - 1) + 1)}
+
+def pyramid_cells(masks, box, cell_width, cell_height):
+    # 几张掩码合起来在 box 范围内的轮廓覆盖到的所有格子（见 rect_cells）。合起来的轮廓只会更大，多算几个格子不影响结果
+    left, top, right, bottom = box
+    union = np.zeros((bottom - top, right - left), np.uint8)
+    for mask in masks:
+        union |= mask[top:bottom, left:right]
+    contours, _ = cv2.findContours(union, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_TC89_L1, offset=(left, top))
+    rows, columns = -(-masks[0].shape[0] // cell_height), -(-masks[0].shape[1] // cell_width)
+    cells = set()
+    for contour in contours:
+        cells |= rect_cells(cv2.boundingRect(contour), cell_width, cell_height, rows, columns)
+    return cells
+
+def cell_runs(cells):
+    # 把格子 {(行, 列)} 按行分成连续的几段 [(行, 起始列, 结束列), ...]，一段一起计算比逐格计算少算外扩的部分
+    runs = []
+    for row, column in sorted(cells):
+        if runs and runs[-1][0] == row and runs[-1][2] == column - 1:
+            runs[-1][2] = column
+        else:
+            runs.append([row, column, column])
+    return [tuple(run) for run in runs]
+
+def refresh_masks(img, masks, box):
+    # 重新计算 img 在 box (left, top, right, bottom) 范围内的各颜色去噪掩码，写入 masks（顺序同 TARGET_COLORS）。
+    # 外扩 MASK_RADIUS 计算，结果与对整张图计算后取这一块完全相同
+    height, width = img.shape[:2]
+    left, top, right, bottom = box
+    x0, y0 = max(left - MASK_RADIUS, 0), max(top - MASK_RADIUS, 0)
+    x1, y1 = min(right + MASK_RADIUS, width), min(bottom + MASK_RADIUS, height)
+    hsv = preprocess(img[y0:y1, x0:x1])
+    for mask, target_color in zip(masks, TARGET_COLORS):
+        patch = clean_mask(color_mask(hsv, target_color))
+        mask[top:bottom, left:right] = patch[top - y0:bottom - y0, left - x0:right - x0]
+
+def detect_blocks_pyramid(img, debug=None, image_path=None, budget=None, cell_size=PYRAMID_CELL_SIZE, grid_size=6):
+    # 金字塔模式，用于高分辨率截图：img 是未经预处理的 BGR 截图。先在缩小到每格约 cell_size 像素的图像上粗识别，
+    # 找出可能有方块的格子，只对这些格子在原分辨率上计算掩码，拼成一张整图大小、其余部分为空的掩码，
+    # 再按原分辨率的格子识别。与识别结果有关的轮廓都完整地落在算过的格子里，结果与 detect_blocks 相同。
+    # budget 是整次识别的时间预算（秒），用完后还没算的格子直接用粗识别的掩码放大填充
+    started = time.perf_counter()
+    verbose = debug is not None and debug.verbose
+    height, width = img.shape[:2]
+    cell_width, cell_height = width // grid_size, height // grid_size
+    scale = cell_size / max(cell_width, cell_height)
+    if scale > 0.5:
+        # 截图本来就不大，缩小省不了多少时间
+        return detect_blocks(preprocess(img), debug, image_path)
+
+    def within_budget():
+        return budget is None or time.perf_counter() - started <= budget
+
+    # 只缩小网格覆盖的部分，缩小后的格子边界与原图对齐。粗识别只用来挑出要算的格子，方块的其余部分会顺着轮廓
+    # 补算出来。用最近邻缩小、不做模糊：每个像素都是原图的像素，命中百分比是原图的抽样估计；
+    # 取平均或模糊会冲淡金钥匙的细线条，使它的格子粗识别时命中过少而被漏掉
+    small_width, small_height = max(round(cell_width * scale), 1), max(round(cell_height * scale), 1)
+    small = cv2.resize(img[:cell_height * grid_size, :cell_width * grid_size],
+                       (small_width * grid_size, small_height * grid_size), interpolation=cv2.INTER_NEAREST)
+    hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+    if verbose:
+        debug.log(f"金字塔识别: 原图尺寸: {img.shape}, 粗识别尺寸: {hsv.shape}")
+
+    # 粗识别的命中百分比离判定阈值还差不到 PYRAMID_MARGIN 的格子都要回到原分辨率计算
+    coarse_masks = []
+    pending = set()
+    for name, target_color in zip(('green', 'red', 'gold'), TARGET_COLORS):
+        mask = color_mask(hsv, target_color)
+        if debug is not None:
+            debug.save_mask(image_path, name, mask)
+        coarse_masks.append(mask)
+        integral = cv2.integral(cv2.threshold(mask, 0, 1, cv2.THRESH_BINARY)[1])
+        coverage = coverage_grids(integral, small_width, small_height)[0]
+        threshold = GOLD_HIT_PERCENTAGE if target_color == GOLD_TARGET_COLOR_HSV else HIT_PERCENTAGE
+        pending.update((row, column) for row, values in enumerate(coverage)
+                       for column, value in enumerate(values) if value >= threshold * (1 - PYRAMID_MARGIN))
+    if not pending:
+        return assemble_blocks([], [], [], debug)
+
+    # 逐行把连续的待算格子一起算（见 refresh_masks）。拼好后，贴着已算格子边界的轮廓可能延伸到没算的格子里，
+    # 把这些格子也算上，直到没有新的格子
+    masks = [np.zeros((height, width), np.uint8) for _ in TARGET_COLORS]
+    done = set()
+    while pending and within_budget():
+        for row, first, last in cell_runs(pending):
+            refresh_masks(img, masks, cell_box({(row, first), (row, last)}, cell_width, cell_height, width, height))
+        done |= pending
+        pending = pyramid_cells(masks, cell_box(done, cell_width, cell_height, width, height),
+                                cell_width, cell_height) - done
+
+    if pending:
+        # 预算用完：没算过的格子用粗识别的掩码去噪后放大填充（网格外不足一格的边角留空）
+        for mask, coarse in zip(masks, coarse_masks):
+            upscaled = cv2.resize(clean_mask(coarse), (cell_width * grid_size, cell_height * grid_size),
+                                  interpolation=cv2.INTER_NEAREST)
+            for row in range(grid_size):
+                for column in range(grid_size):
+                    if (row, column) not in done:
+                        cell = (slice(row * cell_height, (row + 1) * cell_height),
+                                slice(column * cell_width, (column + 1) * cell_width))
+                        mask[cell] = upscaled[cell]
+
+    if verbose:
+        debug.log(f"原分辨率计算的格子: {len(done)}, 预算内未完成: {len(pending)}, "
+                  f"耗时 {time.perf_counter() - started:.3f}s")
+    # 只对有命中像素的格子范围识别，再把格子编号换回整张图的
+    left, top, right, bottom = (0, 0, width, height) if pending else cell_box(done, cell_width, cell_height, width, height)
+    positions = []
+    for mask, target_color in zip(masks, TARGET_COLORS):
+        x, y, w, h = cv2.boundingRect(mask[top:bottom, left:right])
+        if w == 0:
+            positions.append([])
+            continue
+        column, row = (left + x) // cell_width, (top + y) // cell_height
+        if verbose:
+            debug.log(f"识别范围从第 {column} 列、第 {row} 行的格子开始，下面的格子编号相对于这里")
+        _, _, end_x, end_y = cell_box({((top + y + h - 1) // cell_height, (left + x + w - 1) // cell_width)},
+                                      cell_width, cell_height, width, height)
+        blocks = positions_from_cells(mask[row * cell_height:end_y, column * cell_width:end_x], target_color,
+                                      cell_width, cell_height, debug)
+        positions.append([(block[0] + column, block[1] + row) + block[2:] for block in blocks])
+    return assemble_blocks(*positions, debug)
+
+def assemble_blocks(green_positions, red_positions, gold_positions, debug=None):
+    # 合并相邻的同色格子、去重，得到最终的方块列表 [(x, y, 颜色, 宽, 高, 方向), ...]
     blocks = []
 
     # 处理绿色方块
@@ -195,17 +469,22 @@ def process_image(image_path):
             unique_blocks.append(block)
 
     # 打印统计信息
-    print(f"绿色块数量: {len([b for b in unique_blocks if b[2] == 'GREEN'])}")
-    print(f"红色块数量: {len([b for b in unique_blocks if b[2] == 'RED'])}")
-    print(f"金色块数量: {len([b for b in unique_blocks if b[2] == 'GOLD'])}")
+    if debug is not None and debug.verbose:
+        debug.log(f"绿色块数量: {len([b for b in unique_blocks if b[2] == 'GREEN'])}")
+        debug.log(f"红色块数量: {len([b for b in unique_blocks if b[2] == 'RED'])}")
+        debug.log(f"金色块数量: {len([b for b in unique_blocks if b[2] == 'GOLD'])}")
 
     return unique_blocks
 
-# 切换到代码文件所在目录
-os.chdir(os.path.dirname(os.path.abspath(__file__)))
-print("当前工作目录:", os.getcwd())
-
-# 示例使用
-image_path = "img/sekuai.png"
-result = process_image(image_path)
-print(result)
+if __name__ == '__main__':
+    # 示例使用: python find_img.py [截图路径] [-v] [--masks] [--pyramid [--budget 秒]]
+    parser = argparse.ArgumentParser(description="识别一张截图中的方块布局")
+    parser.add_argument('image', nargs='?', default=SAMPLE_IMAGE, help="截图路径，默认使用示例截图")
+    parser.add_argument('-v', '--verbose', action='store_true', help="打印识别过程")
+    parser.add_argument('--masks', action='store_true', help=f"把各颜色的掩码写到 {IMG_DIR}")
+    parser.add_argument('--pyramid', action='store_true', help="金字塔模式：先在缩小的图像上识别，适合高分辨率截图")
+    parser.add_argument('--budget', type=float, help="金字塔模式的时间预算（秒）")
+    args = parser.parse_args()
+    with DetectionDebug(args.verbose, IMG_DIR if args.masks else None) as debug:
+        result = process_image(args.image, debug, args.pyramid, args.budget)
+    print(result)
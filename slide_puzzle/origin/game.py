@@ -1,14 +1,18 @@
 import pygame
 import sys
-from collections import deque
-import time
 import os
-# 打印当前目录
-print(os.getcwd())
-from find_img import process_image
-
-# 初始化Pygame
-pygame.init()
+# 求解器位于上一级目录
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from solver import BFS, IDASTAR, UNIT, Board, MemoryLimitExceeded, SearchTimeout, solve, unit_steps
+from background import BackgroundSolver
+from stats_overlay import draw_stats_overlay, overlay_rect
+from render import DirtyScreen, next_events, open_window
+from surface_cache import SurfaceCache
+from playback import Playback
+from occupancy import OccupancyGrid
+from layout_cache import load_layout
+
+# 导入本模块不会初始化 pygame、打开窗口或识别截图，这些都在 main() 中按需进行
 
 # 设置颜色
 BLACK = (0, 0, 0)
@@ -20,9 +24,18 @@ GOLD = (255, 215, 0)
 WIDTH, HEIGHT = 600, 600
 GRID_SIZE = 6  # 从 5 改为 6
 CELL_SIZE = WIDTH // GRID_SIZE
-
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("方块迷宫游戏")
+SOLVER_MEMORY_LIMIT = 512 * 1024 * 1024  # 求解器内存上限（字节）
+SOLVER_STRATEGY = BFS  # 搜索策略：'bfs'、'astar'、'bidirectional'、'vector'（需要 numpy）或 'idastar'（内存固定，适合大棋盘）
+SOLVER_MOVE_MODEL = UNIT  # 'unit' 每步移动一格；'slide' 每步滑动任意格，搜索层数更少
+IDASTAR_TIME_LIMIT = 60  # IDA* 最多搜索的秒数：它要很多轮才能证明无解（置换表装不下所有状态时永远证明不了），超时就放弃
+SHOW_SOLVER_STATS = False  # 显示求解器逐层统计的浮层，游戏中按 'S' 键切换
+IDLE_RENDERING = True  # 空闲时阻塞等待事件，只重绘发生变化的区域；False 时每帧整屏重绘
+STATUS_RECT = pygame.Rect(0, HEIGHT - 30, WIDTH, 30)  # 求解进度文字所在的区域
+PLAYBACK_MOVE_TIME = 0.2  # 自动解题时 1 倍速下每一步的秒数
+DETECTION_VERBOSE = False  # 打印截图识别过程（命中的格子、轮廓数等），调试识别时打开
+IMAGE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'img', 'sekuai.png')  # 识别方块布局的截图
+
+screen = None  # 由 init_display() 创建
 
 # 定义游戏对象
 class Block:
@@ -36,18 +49,27 @@ class Block:
         self.offset_x = 0
         self.offset_y = 0
         self.move_direction = move_direction  # 'horizontal', 'vertical', 或 'both'
+        self.tween = (0, 0)  # 自动解题动画中的绘制偏移（格）
+        self.grid = None  # 登记了这个方块的 OccupancyGrid
+
+    def get_rect(self):
+        return pygame.Rect(int((self.x + self.tween[0]) * CELL_SIZE), int((self.y + self.tween[1]) * CELL_SIZE),
+                           CELL_SIZE * self.width, CELL_SIZE * self.height)
+
+    def move(self, dx, dy):
+        self.x += dx
+        self.y += dy
+        if self.grid is not None:
+            self.grid.update(self)
+
+    def set_tween(self, fx, fy):
+        self.tween = (fx, fy)
 
     def draw(self):
         # 绘制填充的矩形
-        pygame.draw.rect(screen, self.color, (int(self.x * CELL_SIZE), int(self.y * CELL_SIZE), 
-                         CELL_SIZE * self.width, CELL_SIZE * self.height))
+        pygame.draw.rect(screen, self.color, self.get_rect())
         # 绘制白色边框
-        pygame.draw.rect(screen, (255, 255, 255), (int(self.x * CELL_SIZE), int(self.y * CELL_SIZE), 
-                         CELL_SIZE * self.width, CELL_SIZE * self.height), 2)
-
-    def is_point_inside(self, x, y):
-        return (self.x * CELL_SIZE <= x < (self.x + self.width) * CELL_SIZE and
-                self.y * CELL_SIZE <= y < (self.y + self.height) * CELL_SIZE)
+        pygame.draw.rect(screen, (255, 255, 255), self.get_rect(), 2)
 
     def start_drag(self, mouse_x, mouse_y):
         self.dragging = True
@@ -58,115 +80,127 @@ class Block:
         self.dragging = False
         self.x = round(self.x)
         self.y = round(self.y)
+        self.grid.update(self)
 
-    def drag(self, mouse_x, mouse_y, other_blocks):
+    def drag(self, mouse_x, mouse_y):
+        # 拖动中 x, y 是小数，占用索引里仍是开始拖动时的格子，松开后才更新。
+        # 鼠标移动很快时停在能到达的最远位置，而不是整个拒绝
         if self.dragging:
             new_x = (mouse_x - self.offset_x) / CELL_SIZE
             new_y = (mouse_y - self.offset_y) / CELL_SIZE
             
             if self.move_direction == 'horizontal' or self.move_direction == 'both':
-                if 0 <= new_x <= GRID_SIZE - self.width:
-                    temp_x = new_x
-                    if not self.check_collision(temp_x, self.y, other_blocks):
-                        self.x = temp_x
+                low, high = self.grid.free_range(self, self.x, self.y, True)
+                self.x = min(max(new_x, low), high)
             
             if self.move_direction == 'vertical' or self.move_direction == 'both':
-                if 0 <= new_y <= GRID_SIZE - self.height:
-                    temp_y = new_y
-                    if not self.check_collision(self.x, temp_y, other_blocks):
-                        self.y = temp_y
-
-    def check_collision(self, new_x, new_y, other_blocks):
-        for block in other_blocks:
-            if block != self:
-                if (new_x < block.x + block.width and
-                    new_x + self.width > block.x and
-                    new_y < block.y + block.height and
-                    new_y + self.height > block.y):
-                    return True
-        return False
-
-# 获取方块信息
-image_path = "img/sekuai.png"
-block_data = process_image(image_path)
-
-# 初始化游戏对象
-blocks = []
-key = None
+                low, high = self.grid.free_range(self, self.x, self.y, False)
+                self.y = min(max(new_y, low), high)
 
-for x, y, color, width, height, move_direction in block_data:
-    if color == 'GREEN':
-        block = Block(x, y, GREEN, width, height, move_direction)
-        blocks.append(block)
-    elif color == 'RED':
-        block = Block(x, y, RED, width, height, move_direction)
-        blocks.append(block)
-    elif color == 'GOLD':
-        key = Block(x, y, GOLD, width, height, move_direction)
+def draw_background(surface):
+    # 绘制背景
+    surface.fill(BLACK)
 
-if key is None:
-    key = Block(0, 2, GOLD, 2, 1, 'horizontal')  # 如果没有检测到金钥匙，使用默认值
+    # 绘制网格线
+    for i in range(GRID_SIZE + 1):
+        pygame.draw.line(surface, (50, 50, 50), (i * CELL_SIZE, 0), (i * CELL_SIZE, HEIGHT))
+        pygame.draw.line(surface, (50, 50, 50), (0, i * CELL_SIZE), (WIDTH, i * CELL_SIZE))
 
-# 添加全局变量
-solution = None
-current_step = 0
-last_move_time = 0
+    # 绘制出口
+    pygame.draw.polygon(surface, GOLD, [(WIDTH - 20, HEIGHT // 2 - 20), 
+                                        (WIDTH, HEIGHT // 2), 
+                                        (WIDTH - 20, HEIGHT // 2 + 20)])
 
-def get_solution(blocks, key):
-    initial_state = tuple((b.x, b.y) for b in blocks + [key])
-    queue = deque([(initial_state, [])])
-    visited = set([initial_state])
+# 背景只画一次，之后每帧直接 blit
+surfaces = SurfaceCache(draw_background)
 
-    while queue:
-        state, path = queue.popleft()
-        key_pos = state[-1]
+# 游戏对象，由 load_puzzle() 从截图识别
+blocks = []
+key = None
+occupancy = None  # 格子 -> 方块的索引，用于点击命中和拖动时的碰撞检测
+
+def init_display(headless=False):
+    global screen
+    screen = open_window((WIDTH, HEIGHT), "方块迷宫游戏", headless)
+    return screen
+
+def load_puzzle(image_path=IMAGE_PATH):
+    global blocks, key, occupancy
+
+    # 获取方块信息：同一张截图只识别一次，之后从缓存读取，不需要导入 OpenCV
+    if DETECTION_VERBOSE:
+        from find_img import DetectionDebug
+        block_data = load_layout(image_path, debug=DetectionDebug(verbose=True))
+    else:
+        block_data = load_layout(image_path)
+
+    # 初始化游戏对象
+    blocks = []
+    key = None
+
+    for x, y, color, width, height, move_direction in block_data:
+        if color == 'GREEN':
+            block = Block(x, y, GREEN, width, height, move_direction)
+            blocks.append(block)
+        elif color == 'RED':
+            block = Block(x, y, RED, width, height, move_direction)
+            blocks.append(block)
+        elif color == 'GOLD':
+            key = Block(x, y, GOLD, width, height, move_direction)
+
+    if key is None:
+        key = Block(0, 2, GOLD, 2, 1, 'horizontal')  # 如果没有检测到金钥匙，使用默认值
+
+    occupancy = OccupancyGrid(GRID_SIZE, GRID_SIZE, blocks + [key])
 
-        if key_pos[0] + key.width >= GRID_SIZE:
-            return path
+# 添加全局变量
+solution = None
 
-        for i, (x, y) in enumerate(state):
-            block = blocks[i] if i < len(blocks) else key
-            
-            if block.move_direction in ['horizontal', 'both']:
-                for dx in [-1, 1]:
-                    new_x = x + dx
-                    if 0 <= new_x <= GRID_SIZE - block.width:
-                        new_state = list(state)
-                        new_state[i] = (new_x, y)
-                        new_state = tuple(new_state)
-                        if new_state not in visited and not check_collision(new_state, blocks + [key]):
-                            visited.add(new_state)
-                            new_path = path + [(i, 'left' if dx == -1 else 'right')]
-                            queue.append((new_state, new_path))
-
-            if block.move_direction in ['vertical', 'both']:
-                for dy in [-1, 1]:
-                    new_y = y + dy
-                    if 0 <= new_y <= GRID_SIZE - block.height:
-                        new_state = list(state)
-                        new_state[i] = (x, new_y)
-                        new_state = tuple(new_state)
-                        if new_state not in visited and not check_collision(new_state, blocks + [key]):
-                            visited.add(new_state)
-                            new_path = path + [(i, 'up' if dy == -1 else 'down')]
-                            queue.append((new_state, new_path))
-
-    return None  # 没有找到解决方案
-
-def check_collision(state, blocks):
-    for i, (x1, y1) in enumerate(state):
-        block1 = blocks[i]
-        for j, (x2, y2) in enumerate(state):
-            if i != j:
-                block2 = blocks[j]
-                if (x1 < x2 + block2.width and x1 + block1.width > x2 and
-                    y1 < y2 + block2.height and y1 + block1.height > y2):
-                    return True
-    return False
+DIRECTION_NAMES = {(-1, 0): 'left', (1, 0): 'right', (0, -1): 'up', (0, 1): 'down'}
+DIRECTION_VECTORS = {name: vector for vector, name in DIRECTION_NAMES.items()}
+
+def get_solution(blocks, key, strategy=None, move_model=None, progress=None, stats=None, on_level=None):
+    all_blocks = blocks + [key]
+    specs = [(b.x, b.y, b.width, b.height, b.move_direction) for b in all_blocks]
+    # 钥匙右边缘到达右边界即为解开
+    goal_positions = [(GRID_SIZE - key.width, y) for y in range(GRID_SIZE)]
+    try:
+        board = Board(specs, len(blocks), goal_positions, GRID_SIZE, move_model or SOLVER_MOVE_MODEL,
+                      SOLVER_MEMORY_LIMIT)
+    except MemoryLimitExceeded as e:
+        print(e)
+        return None
+    start = board.pack([(b.x, b.y) for b in all_blocks])
+    strategy = strategy or SOLVER_STRATEGY
+    try:
+        try:
+            path = solve(board, start, SOLVER_MEMORY_LIMIT, strategy,
+                         IDASTAR_TIME_LIMIT if strategy == IDASTAR else None,
+                         stats=stats, progress=progress, on_level=on_level)
+        except MemoryLimitExceeded as e:
+            if strategy == IDASTAR:
+                raise
+            print(e)
+            # 访问集合超出上限（大棋盘）时改用内存固定的 IDA*，多花时间但不会超出上限
+            path = solve(board, start, SOLVER_MEMORY_LIMIT, IDASTAR, IDASTAR_TIME_LIMIT, stats=stats,
+                         progress=progress, on_level=on_level)
+    except MemoryLimitExceeded as e:
+        print(e)
+        return None
+    except SearchTimeout:
+        print(f"IDA* 搜索了 {IDASTAR_TIME_LIMIT} 秒仍没有找到解，放弃（布局可能无解）")
+        return None
+    if path is None:
+        return None  # 没有找到解决方案
+    # 展开成逐格移动，供提示和自动解题逐步播放
+    return [(i, DIRECTION_NAMES[(dx, dy)]) for i, dx, dy in unit_steps(path)]
 
 def get_solution_hint(blocks, key):
     global solution
     solution = get_solution(blocks, key)
+    return format_solution_hint(solution, blocks, key)
+
+def format_solution_hint(solution, blocks, key):
     if solution is None:
         return "无法找到解决方案。"
 
@@ -178,93 +212,147 @@ def get_solution_hint(blocks, key):
 
     return hint
 
-def move_block(block, direction):
-    if direction == 'left':
-        block.x -= 1
-    elif direction == 'right':
-        block.x += 1
-    elif direction == 'up':
-        block.y -= 1
-    elif direction == 'down':
-        block.y += 1
-
-# 主游戏循环
-running = True
-selected_block = None
-game_won = False
-auto_solve = False
-
-while running:
-    current_time = time.time()
-    
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            if event.button == 1 and not game_won and not auto_solve:  # 左键点击，且游戏未胜利，且不在自动解题中
-                for block in blocks + [key]:
-                    if block.is_point_inside(event.pos[0], event.pos[1]):
+def make_playback(solution):
+    # [(方块序号, 方向), ...] -> 自动解题的回放，由主循环按帧推进
+    steps = []
+    for block_index, direction in solution:
+        block = blocks[block_index] if block_index < len(blocks) else key
+        steps.append((block, *DIRECTION_VECTORS[direction]))
+    return Playback(steps, PLAYBACK_MOVE_TIME)
+
+def main(headless=False):
+    global solution
+
+    if key is None:
+        load_puzzle()
+    if headless:
+        # 无窗口运行：只识别截图并输出解题步骤
+        print(get_solution_hint(blocks, key))
+        return
+    if screen is None:
+        init_display()
+
+    # 主游戏循环
+    running = True
+    selected_block = None
+    game_won = False
+    playback = None  # 自动解题的回放
+    background_solver = BackgroundSolver()
+    status_font = pygame.font.Font(None, 28)
+    stats_font = pygame.font.Font(None, 20)
+    won_font = pygame.font.Font(None, 74)
+    show_stats = SHOW_SOLVER_STATS
+    clock = pygame.time.Clock()
+    renderer = DirtyScreen(screen, IDLE_RENDERING)
+
+    def draw_frame(surface):
+        # 背景（网格线和出口）
+        surface.blit(surfaces.background(surface.get_size()), (0, 0))
+
+        # 绘制所有方块
+        for block in blocks + [key]:
+            block.draw()
+
+        # 如果游戏胜利，显示胜利消息
+        if game_won:
+            text = surfaces.text(won_font, 'success!', (255, 255, 255))
+            text_rect = text.get_rect(center=(WIDTH // 2, HEIGHT // 2))
+            surface.blit(text, text_rect)
+
+        # 显示求解进度，返回求解、自动解题过程中每帧都在变化的区域
+        live = []
+        if background_solver.running:
+            status = f"Solving... {background_solver.states} states, {background_solver.elapsed():.1f}s (Esc to cancel)"
+            surface.blit(surfaces.text(status_font, status, (255, 255, 255), BLACK), (10, HEIGHT - 30))
+            live.append(STATUS_RECT)
+        elif playback is not None:
+            surface.blit(surfaces.text(stats_font, playback.status(), (255, 255, 255), BLACK), (10, HEIGHT - 24))
+            live.append(STATUS_RECT)
+        if show_stats and (background_solver.running or background_solver.levels):
+            draw_stats_overlay(surface, stats_font, background_solver, surfaces=surfaces)
+            if background_solver.running:
+                live.append(overlay_rect(stats_font))
+        return live
+
+    while running:
+        # 空闲时阻塞等待事件，求解或自动解题时按帧率刷新
+        active = background_solver.pending or (playback is not None and playback.playing)
+        for event in next_events(clock, active or not IDLE_RENDERING):
+            renderer.handle_event(event)
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if event.button == 1 and not game_won and playback is None and not background_solver.running:  # 左键点击，且游戏未胜利，且不在自动解题或求解中
+                    block = occupancy.block_at(event.pos[0] // CELL_SIZE, event.pos[1] // CELL_SIZE)
+                    if block is not None:
                         selected_block = block
                         block.start_drag(event.pos[0], event.pos[1])
-                        break
-        elif event.type == pygame.MOUSEBUTTONUP:
-            if event.button == 1 and selected_block:
-                selected_block.end_drag()
-                selected_block = None
-        elif event.type == pygame.MOUSEMOTION:
-            if selected_block and not auto_solve:
-                selected_block.drag(event.pos[0], event.pos[1], blocks + [key])
-        elif event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_h:  # 按 'H' 键显示提示并开始自动解题
-                hint = get_solution_hint(blocks, key)
-                print(hint)
-                auto_solve = True
-                current_step = 0
-                last_move_time = current_time
-
-    # 自动解题
-    if auto_solve and solution and current_step < len(solution):
-        if current_time - last_move_time >= 0.2:  # 每秒执行一步
-            block_index, direction = solution[current_step]
-            block = blocks[block_index] if block_index < len(blocks) else key
-            move_block(block, direction)
-            current_step += 1
-            last_move_time = current_time
-            
-            if current_step == len(solution):
-                auto_solve = False
+            elif event.type == pygame.MOUSEBUTTONUP:
+                if event.button == 1 and selected_block:
+                    selected_block.end_drag()
+                    selected_block = None
+            elif event.type == pygame.MOUSEMOTION:
+                if selected_block and playback is None:
+                    selected_block.drag(event.pos[0], event.pos[1])
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_h and playback is None:  # 按 'H' 键在后台求解，完成后显示提示并开始自动解题
+                    if selected_block:
+                        selected_block.end_drag()
+                        selected_block = None
+                    background_solver.start(get_solution, blocks, key)
+                    renderer.invalidate(STATUS_RECT)
+                    renderer.invalidate(overlay_rect(stats_font))
+                elif event.key == pygame.K_ESCAPE:  # 按 Esc 取消求解或停止自动解题
+                    background_solver.cancel()
+                    if playback is not None:
+                        playback.stop()
+                        playback = None
+                elif event.key == pygame.K_s:  # 按 'S' 键显示/隐藏求解统计
+                    show_stats = not show_stats
+                    renderer.invalidate(overlay_rect(stats_font))
+                elif playback is not None:
+                    # 自动解题控制：空格暂停/继续，'N' 或右方向键走一步，End 直接到最后，+/- 调整速度
+                    if event.key == pygame.K_SPACE:
+                        playback.toggle_pause()
+                    elif event.key in (pygame.K_n, pygame.K_RIGHT):
+                        playback.step()
+                    elif event.key == pygame.K_END:
+                        playback.skip_to_end()
+                    elif event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS):
+                        playback.faster()
+                    elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                        playback.slower()
+
+        # 后台求解完成
+        if background_solver.poll():
+            if background_solver.error is not None:
+                print(f"求解出错: {background_solver.error}")
+            else:
+                solution = background_solver.result
+                print(format_solution_hint(solution, blocks, key))
+                if solution:
+                    playback = make_playback(solution)
+
+        # 自动解题：按上一帧经过的时间推进回放
+        if playback is not None:
+            playback.update(clock.get_time() / 1000)
+            if playback.done:
+                playback = None
                 print("自动解题完成！")
 
-    # 检查游戏是否胜利
-    if key.x + key.width >= GRID_SIZE:
-        game_won = True
-        auto_solve = False
-
-    # 绘制背景
-    screen.fill(BLACK)
-
-    # 绘制网格线
-    for i in range(GRID_SIZE + 1):
-        pygame.draw.line(screen, (50, 50, 50), (i * CELL_SIZE, 0), (i * CELL_SIZE, HEIGHT))
-        pygame.draw.line(screen, (50, 50, 50), (0, i * CELL_SIZE), (WIDTH, i * CELL_SIZE))
-
-    # 绘制所有方块
-    for block in blocks + [key]:
-        block.draw()
-
-    # 绘制出口
-    pygame.draw.polygon(screen, GOLD, [(WIDTH - 20, HEIGHT // 2 - 20), 
-                                       (WIDTH, HEIGHT // 2), 
-                                       (WIDTH - 20, HEIGHT // 2 + 20)])
+        # 检查游戏是否胜利
+        if key.x + key.width >= GRID_SIZE:
+            if not game_won:
+                renderer.invalidate()
+            game_won = True
 
-    # 如果游戏胜利，显示胜利消息
-    if game_won:
-        font = pygame.font.Font(None, 74)
-        text = font.render('success!', True, (255, 255, 255))
-        text_rect = text.get_rect(center=(WIDTH // 2, HEIGHT // 2))
-        screen.blit(text, text_rect)
+        # 只重绘位置发生变化的方块和求解进度
+        for block in blocks + [key]:
+            renderer.track(block, block.get_rect())
+        renderer.present(draw_frame)
 
-    pygame.display.flip()
+    pygame.quit()
+    sys.exit()
 
-pygame.quit()
-sys.exit()
+if __name__ == '__main__':
+    main(headless='--headless' in sys.argv[1:])
@@ -0,0 +1,53 @@
+import hashlib
+import json
+import os
+
+# 截图识别结果的磁盘缓存：键是截图内容和识别代码 find_img.py 的哈希（HSV 范围、阈值等参数都写在代码里，
+# 改动参数或算法后旧结果自然失效）。命中时直接返回方块列表，不导入 OpenCV，也不解码图像。
+
+VERSION = 1
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(os.path.dirname(BASE_DIR), 'cache', 'layouts')  # 与距离表共用被忽略的 cache 目录
+DETECTOR_PATH = os.path.join(BASE_DIR, 'find_img.py')
+
+_detector_hash = None
+
+
+def layout_key(image_path):
+    # 截图读取失败时返回 None，此时不使用缓存
+    global _detector_hash
+    try:
+        with open(image_path, 'rb') as f:
+            image_hash = hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        return None
+    if _detector_hash is None:
+        with open(DETECTOR_PATH, 'rb') as f:
+            _detector_hash = hashlib.sha1(f.read()).hexdigest()
+    return hashlib.sha1(f"{VERSION}:{_detector_hash}:{image_hash}".encode()).hexdigest()[:16]
+
+
+def load_layout(image_path, cache_dir=None, debug=None):
+    # 返回与 find_img.process_image 相同的方块列表 [(x, y, 颜色, 宽, 高, 方向), ...]。
+    # 传入 debug（find_img.DetectionDebug）表示需要识别过程的调试输出，这时总是重新识别并更新缓存
+    key = layout_key(image_path)
+    path = None if key is None else os.path.join(cache_dir or CACHE_DIR, f"{key}.json")
+    if path is not None and debug is None:
+        try:
+            with open(path, encoding='utf-8') as f:
+                return [tuple(block) for block in json.load(f)]
+        except (OSError, ValueError):
+            pass  # 没有缓存或缓存文件损坏，重新识别
+
+    from find_img import process_image
+    blocks = process_image(image_path, debug)
+    if path is not None:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(blocks, f)
+            os.replace(tmp_path, path)  # 写完再替换，避免其他进程读到半个文件
+        except OSError as e:
+            print(f"无法写入识别缓存: {e}")  # 只是下次启动还要重新识别
+    return blocks
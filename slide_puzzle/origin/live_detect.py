@@ -0,0 +1,265 @@
+import json
+import sys
+import threading
+from collections import deque
+
+import cv2
+import numpy as np
+
+from find_img import (MASK_RADIUS, TARGET_COLORS, assemble_blocks, cell_bands, cell_box, cell_runs, clean_mask,
+                      color_mask, coverage_grids, positions_from_grids, preprocess, rect_cells, refresh_masks)
+
+# 实时识别：跟踪视频或屏幕录制中连续帧的棋盘布局。每帧先与上次识别时的画面逐格比较，只对有变化像素影响到的格子
+# 重新做模糊、HSV 转换和颜色掩码，更新这些格子的命中统计，并只重新寻找与这些格子相接的轮廓；布局变化时产生事件。
+# 其余格子的统计、轮廓和方块沿用上一次的结果，识别结果与对整帧调用 find_img.detect_blocks 相同。
+# LiveCapture 在后台线程中处理帧，队列满时丢弃最旧的帧，处理跟不上时总是先处理较新的画面。
+#
+# 用法: python live_detect.py video.mp4   （或摄像头编号），每次布局变化输出一行 JSON
+
+DIFF_THRESHOLD = 24  # 像素某个通道的变化超过这个值才算变化，压缩噪声和轻微闪烁不会触发重新识别
+MAX_QUEUED_FRAMES = 4
+
+
+class LiveDetector:
+    def __init__(self, grid_size=6):
+        self.grid_size = grid_size
+        self.frame = None       # 当前掩码所对应的画面，只在重新识别过的格子更新，低于阈值的变化会一直累积到超过阈值
+        self.masks = None       # 各目标颜色去噪后的整张掩码，顺序同 find_img.TARGET_COLORS
+        self.grids = None       # 各颜色掩码的逐格统计 (coverage, edges)，见 find_img.coverage_grids
+        self.contours = None    # 各颜色掩码中的轮廓 [(起点, 外接矩形, 方块或 None), ...]，按 findContours 找到的顺序排列
+        self.blocks = None      # 当前布局
+        self.frames = 0         # 已处理的帧数
+
+    def update(self, frame, index=None):
+        # 处理一帧 BGR 图像。布局变化时返回事件 {'frame', 'blocks', 'previous', 'cells'}，
+        # cells 是这一帧发生变化的格子 [(列, 行), ...]；布局不变时返回 None
+        index = self.frames if index is None else index
+        self.frames += 1
+        height, width = frame.shape[:2]
+        if self.frame is None or frame.shape != self.frame.shape:
+            self.frame = frame.copy()
+            self.cell_width, self.cell_height = width // self.grid_size, height // self.grid_size
+            # 格子的行数和列数，同 coverage_grids，包括边缘不足一格的部分
+            self.rows = len(cell_bands(height, self.cell_height)[0])
+            self.columns = len(cell_bands(width, self.cell_width)[0])
+            hsv = preprocess(frame)
+            self.masks = [clean_mask(color_mask(hsv, color)) for color in TARGET_COLORS]
+            self.grids = [coverage_grids(cv2.integral(cv2.threshold(mask, 0, 1, cv2.THRESH_BINARY)[1]),
+                                         self.cell_width, self.cell_height) for mask in self.masks]
+            self.contours = [[] for _ in TARGET_COLORS]
+            changed = dirty = {(row, column) for row in range(self.rows) for column in range(self.columns)}
+        else:
+            changed, dirty = self._changed_cells(frame)
+            if not changed:
+                return None
+            self._patch(frame, dirty)
+        for number, color in enumerate(TARGET_COLORS):
+            self._update_contours(number, color, dirty)
+
+        previous = self.blocks
+        self.blocks = assemble_blocks(*([block for _, _, block in contours if block is not None]
+                                        for contours in self.contours))
+        if self.blocks == previous:
+            return None
+        last = self.grid_size - 1
+        cells = sorted({(min(column, last), min(row, last)) for row, column in changed}, key=lambda cell: cell[::-1])
+        return {'frame': index, 'blocks': self.blocks, 'previous': previous or [], 'cells': cells}
+
+    def _changed_cells(self, frame):
+        # 含有变化像素的格子，以及变化像素外扩 MASK_RADIUS 后碰到的格子（掩码要重新计算的格子），都是 {(行, 列)}
+        diff = cv2.absdiff(self.frame, frame)
+        # 把各通道摊平成一行，一次阈值处理就能找出任一通道变化的像素；积分图的每一列是一个像素的一个通道
+        changed = cv2.threshold(diff.reshape(diff.shape[0], -1), DIFF_THRESHOLD, 1, cv2.THRESH_BINARY)[1]
+        integral = cv2.integral(changed)
+        if not integral[-1, -1]:
+            return set(), set()
+        return self._hit_cells(integral, 0), self._hit_cells(integral, MASK_RADIUS)
+
+    def _hit_cells(self, integral, radius):
+        # 每格外扩 radius 像素的范围内有变化像素的格子
+        height, width, channels = self.frame.shape
+        rows, columns = cell_bands(height, self.cell_height), cell_bands(width, self.cell_width)
+        top, bottom = np.clip(rows[0] - radius, 0, height), np.clip(rows[1] + radius, 0, height)
+        left, right = (np.clip(edge, 0, width) * channels for edge in (columns[0] - radius, columns[1] + radius))
+        hits = (integral[np.ix_(bottom, right)] - integral[np.ix_(top, right)]
+                - integral[np.ix_(bottom, left)] + integral[np.ix_(top, left)])
+        return {(int(row), int(column)) for row, column in zip(*np.nonzero(hits))}
+
+    def _patch(self, frame, cells):
+        # 重新计算这些格子的掩码和逐格统计，每行连续的格子一起算
+        height, width = frame.shape[:2]
+        for row, first, last in cell_runs(cells):
+            left, top, right, bottom = cell_box({(row, first), (row, last)}, self.cell_width, self.cell_height,
+                                                width, height)
+            refresh_masks(frame, self.masks, (left, top, right, bottom))
+            for mask, (coverage, edges) in zip(self.masks, self.grids):
+                integral = cv2.integral(cv2.threshold(mask[top:bottom, left:right], 0, 1, cv2.THRESH_BINARY)[1])
+                patch_coverage, patch_edges = coverage_grids(integral, self.cell_width, self.cell_height)
+                coverage[row][first:last + 1] = patch_coverage[0]
+                for side, (hits, sizes) in patch_edges.items():
+                    edges[side][0][row][first:last + 1] = hits[0]
+                    edges[side][1][row][first:last + 1] = sizes[0]
+            self.frame[top:bottom, left:right] = frame[top:bottom, left:right]
+
+    def _update_contours(self, number, color, cells):
+        # 重新寻找与这些格子相接的轮廓并计算它们的方块。旧轮廓或新轮廓伸出这些格子时，把它们覆盖的格子也加进来，
+        # 直到找到的轮廓都完整地落在其中；其余轮廓的格子统计没有变，方块沿用上一次的
+        contours = self.contours[number]
+        region = set(cells)
+        while True:
+            touched = set()
+            for _, rect, _ in contours:
+                covered = self._rect_cells(rect)
+                if covered & region:
+                    touched |= covered
+            if touched <= region:
+                found = self._find_contours(self.masks[number], region)
+                for _, rect in found:
+                    touched |= self._rect_cells(rect)
+                if touched <= region:
+                    break
+            region |= touched
+
+        coverage, edges = self.grids[number]
+        kept = [contour for contour in contours if not self._rect_cells(contour[1]) & region]
+        for start, rect in found:
+            blocks = positions_from_grids([rect], self.cell_width, self.cell_height, coverage, edges, color)
+            kept.append((start, rect, blocks[0] if blocks else None))
+        # findContours 按每个轮廓最先扫描到的像素（最上一行的最左边）从后往前的顺序返回轮廓，这里保持同样的顺序
+        self.contours[number] = sorted(kept, key=lambda contour: contour[0], reverse=True)
+
+    def _find_contours(self, mask, cells):
+        # 掩码在这些格子中的轮廓 [(起点 (y, x), 外接矩形), ...]。相连的格子一起找，格子以外的部分当作空白
+        found = []
+        remaining = set(cells)
+        while remaining:
+            group, stack = set(), [remaining.pop()]
+            while stack:
+                row, column = stack.pop()
+                group.add((row, column))
+                for neighbor in ((row + dy, column + dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1)):
+                    if neighbor in remaining:
+                        remaining.remove(neighbor)
+                        stack.append(neighbor)
+            left, top, right, bottom = cell_box(group, self.cell_width, self.cell_height,
+                                                mask.shape[1], mask.shape[0])
+            crop = mask[top:bottom, left:right].copy()
+            for row in range(top // self.cell_height, (bottom - 1) // self.cell_height + 1):
+                for column in range(left // self.cell_width, (right - 1) // self.cell_width + 1):
+                    if (row, column) not in group:
+                        crop[row * self.cell_height - top:(row + 1) * self.cell_height - top,
+                             column * self.cell_width - left:(column + 1) * self.cell_width - left] = 0
+            # 保留轮廓上的所有点才能找到最先扫描到的像素；外接矩形与 CHAIN_APPROX_TC89_L1 的相同
+            contours, _ = cv2.findContours(crop, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE, offset=(left, top))
+            for contour in contours:
+                points = contour.reshape(-1, 2)
+                first = np.lexsort((points[:, 0], points[:, 1]))[0]
+                found.append(((int(points[first, 1]), int(points[first, 0])), cv2.boundingRect(contour)))
+        return found
+
+    def _rect_cells(self, rect):
+        return rect_cells(rect, self.cell_width, self.cell_height, self.rows, self.columns)
+
+
+class LiveCapture:
+    # 采集线程调用 push() 推入帧，后台线程逐帧交给 LiveDetector，主循环调用 poll() 取走布局变化事件
+    def __init__(self, detector=None, max_queued=MAX_QUEUED_FRAMES):
+        self.detector = detector or LiveDetector()
+        self.thread = None
+        self.error = None
+        self.pushed = 0     # 推入的帧数，也是下一帧的序号
+        self.processed = 0  # 已识别的帧数
+        self.dropped = 0    # 因为来不及处理而丢弃的帧数
+        self._frames = deque(maxlen=max_queued)
+        self._events = deque()
+        self._ready = threading.Condition()
+        self._stopping = False
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self._stopping = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def push(self, frame):
+        # 推入之后不能再修改这一帧的数组
+        with self._ready:
+            if len(self._frames) == self._frames.maxlen:
+                self.dropped += 1  # deque 满了会挤掉最旧的一帧
+            self._frames.append((self.pushed, frame))
+            self.pushed += 1
+            self._ready.notify()
+
+    def poll(self):
+        # 取走目前为止的所有事件
+        events = []
+        while self._events:
+            events.append(self._events.popleft())
+        return events
+
+    def stop(self, drain=True):
+        # drain 为 True 时先处理完队列里剩下的帧，否则直接丢弃
+        if self.thread is None:
+            return
+        with self._ready:
+            if not drain:
+                self.dropped += len(self._frames)
+                self._frames.clear()
+            self._stopping = True
+            self._ready.notify()
+        self.thread.join()
+        self.thread = None
+
+    def _run(self):
+        while True:
+            with self._ready:
+                while not self._frames and not self._stopping:
+                    self._ready.wait()
+                if not self._frames:
+                    return
+                index, frame = self._frames.popleft()
+            try:
+                event = self.detector.update(frame, index)
+            except Exception as e:
+                self.error = e
+                return
+            self.processed += 1
+            if event is not None:
+                self._events.append(event)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("用法: python live_detect.py <视频文件或摄像头编号>", file=sys.stderr)
+        return 2
+    source = int(argv[0]) if argv[0].isdigit() else argv[0]
+    video = cv2.VideoCapture(source)
+    if not video.isOpened():
+        print(f"错误：无法打开视频 '{argv[0]}'。", file=sys.stderr)
+        return 1
+    capture = LiveCapture()
+    capture.start()
+    try:
+        while True:
+            ok, frame = video.read()
+            if not ok:
+                break
+            capture.push(frame)
+            for event in capture.poll():
+                print(json.dumps(event, ensure_ascii=False), flush=True)
+    finally:
+        capture.stop()
+        video.release()
+    for event in capture.poll():
+        print(json.dumps(event, ensure_ascii=False), flush=True)
+    if capture.error is not None:
+        print(f"识别出错: {capture.error}", file=sys.stderr)
+        return 1
+    print(f"共 {capture.pushed} 帧，识别 {capture.processed} 帧，丢弃 {capture.dropped} 帧", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+import argparse
+import json
+import os
+import sys
+
+import cv2
+import numpy as np
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')  # 只用 game.Block 的几何，不需要 pygame 的欢迎信息
+import game
+
+# 合成截图：把已知布局画成 img/sekuai.png 风格的截图（深色棋盘、带底板和边框的方块、渐变色的棒和金钥匙），
+# 方块位置和大小取自游戏自己的 Block.get_rect()，按随机的格子尺寸缩放。每张截图随机改变分辨率、噪声、模糊和
+# 方块颜色，真实布局与这些参数一起写入输出目录的 manifest.jsonl，供 detect_benchmark.py 评估识别的准确率和速度。
+#
+# 用法: python synth_screenshots.py -n 200 -o ../cache/synthetic
+#       python synth_screenshots.py --layouts layouts.jsonl --min-cell 300 --max-cell 700
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LAYOUTS_PATH = os.path.join(os.path.dirname(BASE_DIR), 'benchmark_corpus.jsonl')  # 求解器基准测试的布局语料库
+OUTPUT_DIR = os.path.join(os.path.dirname(BASE_DIR), 'cache', 'synthetic')
+MANIFEST_NAME = 'manifest.jsonl'
+
+# 颜色（BGR）取自 img/sekuai.png
+BACKGROUND = (40, 40, 40)
+GRID_LINE = (50, 50, 50)
+STYLES = {
+    # 底板、边框、格子分隔线，以及棒或钥匙渐变的起止颜色
+    'RED': {'frame': (37, 36, 68), 'border': (41, 44, 105), 'line': (50, 50, 80),
+            'bar': ((90, 95, 234), (34, 47, 215))},
+    'GREEN': {'frame': (38, 71, 44), 'border': (45, 95, 53), 'line': (50, 80, 55),
+              'bar': ((57, 197, 90), (109, 247, 115))},
+    'GOLD': {'frame': (39, 58, 61), 'border': (69, 151, 146), 'line': (50, 68, 70),
+             'bar': ((40, 170, 240), (60, 200, 250))},
+}
+GAME_COLORS = {'RED': game.RED, 'GREEN': game.GREEN, 'GOLD': game.GOLD}
+
+
+def read_layouts(path):
+    # 每行一个 {"id", "blocks"} 的 JSON Lines 文件，例如 benchmark_corpus.jsonl 或 batch_detect.py 的输出
+    layouts = []
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f):
+            if line.strip():
+                entry = json.loads(line)
+                if entry.get('blocks'):
+                    layouts.append((str(entry.get('id', number)), [tuple(block) for block in entry['blocks']]))
+    return layouts
+
+
+def jitter_color(color, gains):
+    return tuple(int(min(max(round(channel * gain), 0), 255)) for channel, gain in zip(color, gains))
+
+
+def bar_shape(width, height, cell_width, cell_height, horizontal):
+    # 方块上的棒：长条和两端的小柄，返回 [(left, top, right, bottom), ...]，坐标相对于方块左上角
+    if not horizontal:
+        width, height, cell_width, cell_height = height, width, cell_height, cell_width
+    left, right = 0.235 * cell_width, width - 0.235 * cell_width
+    top, bottom = 0.22 * cell_height, height - 0.21 * cell_height
+    middle, half = height / 2, 0.07 * cell_height
+    rects = [(left, top, right, bottom),
+             (0.06 * cell_width, middle - half, left, middle + half),
+             (right, middle - half, width - 0.06 * cell_width, middle + half)]
+    if not horizontal:
+        rects = [(t, l, b, r) for l, t, r, b in rects]
+    return rects
+
+
+def key_shape(mask, cell_width, cell_height):
+    # 金钥匙：左格的圆形钥匙头，右边的钥匙杆和齿
+    height = mask.shape[0]
+    size = min(cell_width, cell_height)
+    center = (round(0.42 * cell_width), height // 2)
+    cv2.circle(mask, center, round(0.37 * size), 255, -1, cv2.LINE_AA)
+    shaft_top, shaft_bottom = height // 2 - round(0.12 * size), height // 2 + round(0.06 * size)
+    cv2.rectangle(mask, (center[0], shaft_top), (round(1.9 * cell_width), shaft_bottom), 255, -1, cv2.LINE_AA)
+    tip = np.array([(round(1.9 * cell_width), shaft_top), (round(1.95 * cell_width), (shaft_top + shaft_bottom) // 2),
+                    (round(1.9 * cell_width), shaft_bottom)], np.int32)
+    cv2.fillConvexPoly(mask, tip, 255, cv2.LINE_AA)
+    for start in (1.05, 1.3, 1.55):
+        tooth = np.array([(round(start * cell_width), shaft_bottom), (round((start + 0.2) * cell_width), shaft_bottom),
+                          (round((start + 0.1) * cell_width), shaft_bottom + round(0.18 * size))], np.int32)
+        cv2.fillConvexPoly(mask, tooth, 255, cv2.LINE_AA)
+
+
+def draw_block(image, block, color, cell_width, cell_height, gains):
+    # block 是 game.Block，按格子尺寸把它的 get_rect() 缩放到截图坐标
+    rect = block.get_rect()
+    left, top = rect.x * cell_width // game.CELL_SIZE, rect.y * cell_height // game.CELL_SIZE
+    right, bottom = rect.right * cell_width // game.CELL_SIZE, rect.bottom * cell_height // game.CELL_SIZE
+    style = {name: jitter_color(value, gains) if name != 'bar' else tuple(jitter_color(c, gains) for c in value)
+             for name, value in STYLES[color].items()}
+
+    # 底板、格子分隔线和边框
+    inset = max(1, round(0.008 * cell_width))
+    thickness = max(1, round(cell_width / 200))
+    cv2.rectangle(image, (left + inset, top + inset), (right - inset - 1, bottom - inset - 1), style['frame'], -1)
+    for column in range(1, block.width):
+        x = left + column * cell_width
+        cv2.line(image, (x, top + inset), (x, bottom - inset - 1), style['line'], thickness)
+    for row in range(1, block.height):
+        y = top + row * cell_height
+        cv2.line(image, (left + inset, y), (right - inset - 1, y), style['line'], thickness)
+    cv2.rectangle(image, (left + inset, top + inset), (right - inset - 1, bottom - inset - 1), style['border'], thickness)
+
+    # 棒或钥匙：先画出形状的掩码（抗锯齿），再按掩码把渐变色混合到底板上
+    width, height = right - left, bottom - top
+    mask = np.zeros((height, width), np.uint8)
+    horizontal = block.move_direction != 'vertical'
+    if color == 'GOLD':
+        key_shape(mask, cell_width, cell_height)
+    else:
+        for x0, y0, x1, y1 in bar_shape(width, height, cell_width, cell_height, horizontal):
+            cv2.rectangle(mask, (round(x0), round(y0)), (round(x1) - 1, round(y1) - 1), 255, -1)
+    start, end = (np.array(c, np.float32) for c in style['bar'])
+    # 竖棒的渐变从左到右，横棒和钥匙从上到下
+    steps = np.linspace(0, 1, height if horizontal else width, dtype=np.float32)
+    ramp = start + steps[:, None] * (end - start)
+    fill = np.broadcast_to(ramp[:, None, :] if horizontal else ramp[None, :, :], (height, width, 3))
+    alpha = (mask.astype(np.float32) / 255)[:, :, None]
+    region = image[top:bottom, left:right]
+    region[:] = np.round(region * (1 - alpha) + fill * alpha).astype(np.uint8)
+
+
+def render(layout, cell_width, cell_height, noise=0.0, blur=0.0, jitter=0.0, rng=None, grid_size=6):
+    # 把布局 [(x, y, 颜色, 宽, 高, 方向), ...] 画成 BGR 截图。网格右下方多出不足 grid_size 像素的边角，模拟真实截图的取整
+    rng = rng or np.random.default_rng()
+    extra_x, extra_y = (int(value) for value in rng.integers(0, grid_size, 2))
+    image = np.empty((cell_height * grid_size + extra_y, cell_width * grid_size + extra_x, 3), np.uint8)
+    image[:] = BACKGROUND
+    thickness = max(1, round(cell_width / 200))
+    for i in range(1, grid_size):
+        cv2.line(image, (i * cell_width, 0), (i * cell_width, image.shape[0] - 1), GRID_LINE, thickness)
+        cv2.line(image, (0, i * cell_height), (image.shape[1] - 1, i * cell_height), GRID_LINE, thickness)
+
+    for x, y, color, width, height, direction in layout:
+        gains = 1 + rng.uniform(-jitter, jitter, 3) if jitter else (1, 1, 1)
+        block = game.Block(x, y, GAME_COLORS[color], width, height, direction)
+        draw_block(image, block, color, cell_width, cell_height, gains)
+
+    if blur > 0:
+        image = cv2.GaussianBlur(image, (0, 0), blur)
+    if noise > 0:
+        # cv2.randn 比 numpy 生成正态分布快一个数量级，种子取自 rng，同一个 seed 仍生成相同的截图
+        grain = np.empty((image.shape[0], image.shape[1] * image.shape[2]), np.float32)
+        cv2.setRNGSeed(int(rng.integers(2 ** 31)))
+        cv2.randn(grain, 0, noise)
+        grain = grain.reshape(image.shape)
+        image = cv2.add(image, grain, dtype=cv2.CV_8U)  # 饱和加法，超出 0~255 的截断
+    return image
+
+
+def generate(layouts, count, output_dir, seed=0, min_cell=100, max_cell=640, noise=4.0, blur=1.0, jitter=0.06,
+             extension='.png'):
+    # 轮流使用各个布局生成 count 张截图，返回 manifest 的条目。同一个 seed 生成的截图完全相同
+    rng = np.random.default_rng(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    entries = []
+    for index in range(count):
+        layout_id, layout = layouts[index % len(layouts)]
+        cell_width = int(rng.integers(min_cell, max_cell + 1))
+        cell_height = max(1, round(cell_width * rng.uniform(0.97, 1.03)))  # 截图的格子不一定是正方形
+        params = {
+            'cell_size': [cell_width, cell_height],
+            'noise': round(float(rng.uniform(0, noise)), 3),
+            'blur': round(float(rng.uniform(0, blur)), 3),
+            'jitter': round(float(rng.uniform(0, jitter)), 3),
+        }
+        image = render(layout, cell_width, cell_height, params['noise'], params['blur'], params['jitter'], rng)
+        name = f"synth-{index:04d}{extension}"
+        cv2.imwrite(os.path.join(output_dir, name), image)
+        entries.append({'id': f"synth-{index:04d}", 'image': name, 'layout': layout_id,
+                        'blocks': [list(block) for block in layout], **params})
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="把已知布局画成合成截图，并记录真实布局")
+    parser.add_argument('-n', '--count', type=int, default=100, help="生成的截图数")
+    parser.add_argument('-o', '--output', default=OUTPUT_DIR, help="输出目录，截图和 manifest.jsonl 都写在这里")
+    parser.add_argument('--layouts', default=LAYOUTS_PATH, help="布局来源（JSON Lines，每行有 blocks）")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    parser.add_argument('--min-cell', type=int, default=100, help="格子的最小边长（像素）")
+    parser.add_argument('--max-cell', type=int, default=640, help="格子的最大边长（像素）")
+    parser.add_argument('--noise', type=float, default=4.0, help="高斯噪声标准差的上限")
+    parser.add_argument('--blur', type=float, default=1.0, help="高斯模糊 sigma 的上限")
+    parser.add_argument('--jitter', type=float, default=0.06, help="方块颜色各通道随机缩放的幅度上限")
+    parser.add_argument('--jpeg', action='store_true', help="保存为 JPEG（带压缩失真），默认 PNG")
+    args = parser.parse_args(argv)
+
+    layouts = read_layouts(args.layouts)
+    if not layouts:
+        print(f"错误：'{args.layouts}' 中没有布局。", file=sys.stderr)
+        return 1
+    entries = generate(layouts, args.count, args.output, args.seed, args.min_cell, args.max_cell,
+                       args.noise, args.blur, args.jitter, '.jpg' if args.jpeg else '.png')
+    print(f"生成 {len(entries)} 张截图（{len(layouts)} 个布局）: {os.path.join(args.output, MANIFEST_NAME)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
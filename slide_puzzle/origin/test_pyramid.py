@@ -0,0 +1,33 @@
+import unittest
+
+import numpy as np
+
+import synth_screenshots
+from find_img import detect_blocks, detect_blocks_pyramid, preprocess
+
+# 金字塔模式的回归测试：在格子尺寸各不相同的合成截图上，金字塔模式的结果必须与原分辨率识别完全相同。
+#
+# 用法: python -m unittest test_pyramid
+
+SEED = 3
+RENDERS = 16  # 合成多少张截图
+MIN_CELL, MAX_CELL = 260, 700  # 格子尺寸范围，下限保证每张都会走缩小识别
+
+
+class PyramidMatchesFullResolution(unittest.TestCase):
+    def test_synthetic_corpus(self):
+        rng = np.random.default_rng(SEED)
+        layouts = synth_screenshots.read_layouts(synth_screenshots.LAYOUTS_PATH)
+        for index in range(RENDERS):
+            layout_id, layout = layouts[index * 3 % len(layouts)]
+            cell_width = int(rng.integers(MIN_CELL, MAX_CELL))
+            # 一半的截图格子不是正方形
+            cell_height = cell_width if index % 2 else int(rng.integers(MIN_CELL, MAX_CELL))
+            img = synth_screenshots.render(layout, cell_width, cell_height, rng.uniform(0, 4), rng.uniform(0, 1),
+                                           rng.uniform(0, 0.06), rng)
+            with self.subTest(layout=layout_id, cell=(cell_width, cell_height)):
+                self.assertEqual(detect_blocks_pyramid(img), detect_blocks(preprocess(img)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+# 解法回放：主循环每帧以经过的时间调用 update()，每一步移动播放成一段补间动画，不阻塞事件处理。
+# 方块需要提供 move(dx, dy)（按格精确移动）和 set_tween(fx, fy)（只影响绘制的偏移，单位是格）。
+# 补间只改变绘制位置，一步播放完才调用 move，所以方块的格子坐标始终是精确的整数。
+
+SPEEDS = (0.25, 0.5, 1, 2, 4, 8)  # 可选的播放速度倍数
+MAX_FRAME_TIME = 0.25  # 单帧最多推进的秒数，窗口被拖动或卡住后不会一下子跳过很多步
+
+
+def ease(t):
+    # 先加速后减速
+    return t * t * (3 - 2 * t)
+
+
+class Playback:
+    def __init__(self, steps, move_time):
+        # steps: [(方块, dx, dy), ...] 逐格的移动；move_time: 1 倍速下每一步的秒数
+        self.steps = list(steps)
+        self.move_time = move_time
+        self.index = 0       # 正在播放的一步
+        self.elapsed = 0.0   # 这一步已经播放的秒数（已乘上速度）
+        self.speed = 1
+        self.paused = False
+
+    @property
+    def done(self):
+        return self.index >= len(self.steps)
+
+    @property
+    def playing(self):
+        # 需要按帧率刷新
+        return not self.paused and not self.done
+
+    def update(self, dt):
+        # 推进 dt 秒，返回方块的位置是否有变化
+        if not self.playing:
+            return False
+        self.elapsed += min(dt, MAX_FRAME_TIME) * self.speed
+        while not self.done and self.elapsed >= self.move_time:
+            self.elapsed -= self.move_time
+            self._finish_step()
+        if self.done:
+            self.elapsed = 0.0
+        else:
+            self._show_tween()
+        return True
+
+    def step(self):
+        # 立即完成当前这一步（暂停时用来逐步查看）
+        if not self.done:
+            self._finish_step()
+            self.elapsed = 0.0
+
+    def skip_to_end(self):
+        while not self.done:
+            self._finish_step()
+        self.elapsed = 0.0
+
+    def stop(self):
+        # 停在当前的格子上，正在播放的这一步不再执行
+        if not self.done:
+            block, _, _ = self.steps[self.index]
+            block.set_tween(0, 0)
+            self.steps = self.steps[:self.index]
+
+    def toggle_pause(self):
+        self.paused = not self.paused
+
+    def faster(self):
+        self.speed = next((s for s in SPEEDS if s > self.speed), self.speed)
+
+    def slower(self):
+        self.speed = next((s for s in reversed(SPEEDS) if s < self.speed), self.speed)
+
+    def _finish_step(self):
+        block, dx, dy = self.steps[self.index]
+        block.set_tween(0, 0)
+        block.move(dx, dy)
+        self.index += 1
+
+    def _show_tween(self):
+        block, dx, dy = self.steps[self.index]
+        t = ease(self.elapsed / self.move_time)
+        block.set_tween(dx * t, dy * t)
+
+    def status(self):
+        state = "paused" if self.paused else f"x{self.speed:g}"
+        return f"Playback {self.index}/{len(self.steps)} {state} (Space pause, N step, End skip, +/- speed, Esc stop)"
@@ -0,0 +1,92 @@
+import os
+
+import pygame
+
+# 脏矩形渲染：记录每帧发生变化的区域，只在这些区域内重绘并用 display.update 提交，画面不变时什么都不画。
+# 配合 next_events，没有动画或后台求解时阻塞等待下一个事件，空闲的窗口几乎不占 CPU。
+
+FPS = 60
+FULL_REDRAW_RATIO = 0.5  # 脏区域总面积超过屏幕的这个比例时直接整屏重绘
+# 窗口重新露出、恢复或改变大小后，窗口内容可能已经丢失，需要整屏重绘
+FULL_REDRAW_EVENTS = (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED,
+                      pygame.WINDOWSIZECHANGED)
+
+
+def open_window(size, caption, headless=False):
+    # 初始化 pygame 并创建窗口。headless 时使用 SDL 的 dummy 驱动，不需要显示器（测试、批处理、服务器）
+    if headless:
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        os.environ['SDL_AUDIODRIVER'] = 'dummy'
+    pygame.init()
+    screen = pygame.display.set_mode(size)
+    pygame.display.set_caption(caption)
+    return screen
+
+
+def next_events(clock, active, fps=FPS):
+    # 有东西在动（动画、后台求解）时按帧率轮询事件；空闲时阻塞到下一个事件
+    if active:
+        clock.tick(fps)
+        return pygame.event.get()
+    return [pygame.event.wait()] + pygame.event.get()
+
+
+class DirtyScreen:
+    def __init__(self, screen, enabled=True):
+        # enabled 为 False 时每次都整屏重绘，与原来的 display.flip 相同
+        self.screen = screen
+        self.rect = screen.get_rect()
+        self.enabled = enabled
+        self.dirty = [self.rect]  # 第一帧整屏绘制
+        self.live = []            # 上一帧画出的、内容每帧都在变化的区域（进度文字等），下一帧继续重绘
+        self.tracked = {}         # 对象 -> 上一帧的矩形
+
+    def invalidate(self, rect=None):
+        self.dirty.append(self.rect if rect is None else pygame.Rect(rect))
+
+    def track(self, key, rect):
+        # 对象的矩形与上一帧不同时，旧位置和新位置都要重绘
+        old = self.tracked.get(key)
+        if old != rect:
+            if old is not None:
+                self.dirty.append(old)
+            self.dirty.append(pygame.Rect(rect))
+            self.tracked[key] = pygame.Rect(rect)
+
+    def handle_event(self, event):
+        if event.type in FULL_REDRAW_EVENTS:
+            self.invalidate()
+
+    def present(self, draw):
+        # draw(surface) 画出整个画面，返回其中内容每帧都在变化的区域；
+        # 它只在脏区域内被调用（用裁剪区域限制绘制范围），最后只提交这些区域。返回是否画了东西
+        if not self.enabled:
+            self.dirty = [self.rect]
+        regions = self._regions(self.dirty + self.live)
+        self.dirty = []
+        if not regions:
+            return False
+        live = None
+        for region in regions:
+            self.screen.set_clip(region)
+            live = draw(self.screen)
+        self.screen.set_clip(None)
+        self.live = [pygame.Rect(rect) for rect in live or ()]
+        pygame.display.update(regions)
+        return True
+
+    def _regions(self, rects):
+        # 裁剪到屏幕内，相互重叠的合并成一个
+        regions = []
+        for rect in rects:
+            rect = rect.clip(self.rect)
+            if not rect.width or not rect.height:
+                continue
+            i = rect.collidelist(regions)
+            while i != -1:
+                rect.union_ip(regions.pop(i))
+                i = rect.collidelist(regions)
+            regions.append(rect)
+        if sum(r.width * r.height for r in regions) > self.rect.width * self.rect.height * FULL_REDRAW_RATIO:
+            return [self.rect]
+        return regions
@@ -0,0 +1,891 @@
+import heapq
+import sys
+import time
+from array import array
+from itertools import count, product
+
+# 位棋盘状态引擎
+# 棋盘上每个格子对应整数中的一位，方块占用的格子用位掩码表示；
+# 每个方块的位置编号（在其所有合法位置中的序号）打包进一个整数作为状态。
+
+HORIZONTAL = 'horizontal'
+VERTICAL = 'vertical'
+BOTH = 'both'
+
+# 搜索策略
+BFS = 'bfs'
+ASTAR = 'astar'
+BIDIRECTIONAL = 'bidirectional'
+VECTOR = 'vector'  # 用 NumPy 整层展开的广度优先搜索，见 vector_solver.py
+IDASTAR = 'idastar'  # 迭代加深 A*，内存固定，适合访问集合放不进内存的大棋盘
+STRATEGIES = (BFS, ASTAR, BIDIRECTIONAL, VECTOR, IDASTAR)
+
+# 移动模型：'unit' 每步移动一格；'slide' 每步沿方向滑动任意格
+UNIT = 'unit'
+SLIDE = 'slide'
+MOVE_MODELS = (UNIT, SLIDE)
+
+# 相邻的几个方块合并成一组查表，每组表项数（位置组合数 x 待检查格子的占用组合数）的上限
+GROUP_ENTRIES = 1 << 14
+# 一组的合法移动表合计超过这么多项时不再枚举所有占用组合，展开状态时逐个检查移动需要空出的格子。
+# 只有大棋盘上能四向滑动的方块才会超过：8x8 棋盘上一个 1x1 方块就有 64 个位置 x 2^14 种占用组合
+LEGAL_TABLE_ENTRIES = 1 << 16
+# 合法移动表每项的大致开销（字典槽位 + 移动元组），建表前按它检查内存上限
+LEGAL_ENTRY_BYTES = 120
+
+# 访问集合中每个状态的大致开销（集合槽位 + int 对象），用于估算内存
+SEEN_STATE_BYTES = 80
+
+# IDA* 置换表的默认项数；给了内存上限时按上限缩小。每项保存打包状态 (uint64)、步数和迭代轮次 (各 uint16)，
+# 状态超过 64 位时打包状态改存在 list 里，每项的开销见 TranspositionTable.entry_bytes
+TRANSPOSITION_ENTRIES = 1 << 22
+TRANSPOSITION_ENTRY_BYTES = 12
+TRANSPOSITION_WAYS = 4  # 置换表每个桶的槽位数
+
+
+class MemoryLimitExceeded(MemoryError):
+    pass
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class NeedCheck:
+    # 待检查的格子太多、没有枚举合法移动表时代替表里的字典，用法相同：
+    # legal[占用情况] 逐个检查移动需要空出的格子，返回合法的 (状态增量, 移动编号)
+    __slots__ = ('moves',)
+
+    def __init__(self, moves):
+        self.moves = tuple(moves)
+
+    def __getitem__(self, occupied):
+        return tuple((delta, move) for delta, need, move in self.moves if not occupied & need)
+
+
+class Board:
+    def __init__(self, specs, goal_block, goal_positions, grid_size=6, move_model=UNIT, max_bytes=None):
+        # specs: [(x, y, width, height, direction), ...]，direction 为 'horizontal'、'vertical' 或 'both'
+        # 初始的 x, y 决定横向/纵向方块所在的行/列
+        # grid_size: 正方形棋盘的边长，或者 (列数, 行数)
+        # max_bytes: 预先计算的移动表超过这么多字节时抛出 MemoryLimitExceeded
+        if move_model not in MOVE_MODELS:
+            raise ValueError(f"未知的移动模型: {move_model}")
+        self.grid_size = grid_size
+        self.columns, self.rows = (grid_size, grid_size) if isinstance(grid_size, int) else grid_size
+        self.move_model = move_model
+        self.specs = [tuple(spec) for spec in specs]
+        self.size = len(self.specs)
+        self.positions = []       # 每个方块的所有合法位置 [(x, y), ...]
+        self.position_index = []  # (x, y) -> 位置编号
+        self.footprints = []      # 每个位置对应的占用掩码
+        self.shifts = []
+        self.field_masks = []
+        self.steps = []           # 每个位置的移动 (新位置编号, 需要空出的格子掩码, dx, dy)
+
+        shift = 0
+        for x, y, width, height, direction in self.specs:
+            positions = self._block_positions(x, y, width, height, direction)
+            index = {pos: p for p, pos in enumerate(positions)}
+            footprints = [self._footprint(px, py, width, height) for px, py in positions]
+            bits = max(1, (len(positions) - 1).bit_length())
+
+            steps = []
+            for p, (px, py) in enumerate(positions):
+                moves = []
+                for dx, dy in self._directions(direction):
+                    # 滑动模型下沿途经过的格子都必须是空的
+                    need, distance = 0, 1
+                    while (px + dx * distance, py + dy * distance) in index:
+                        q = index[(px + dx * distance, py + dy * distance)]
+                        need |= footprints[q] & ~footprints[p]
+                        moves.append((q, need, dx * distance, dy * distance))
+                        if move_model == UNIT:
+                            break
+                        distance += 1
+                steps.append(tuple(moves))
+
+            self.positions.append(positions)
+            self.position_index.append(index)
+            self.footprints.append(footprints)
+            self.shifts.append(shift)
+            self.field_masks.append((1 << bits) - 1)
+            self.steps.append(steps)
+            shift += bits
+
+        self.state_bits = shift
+        self.goal_block = goal_block
+        self.goal_positions = frozenset(goal_positions)
+        self.goal_values = frozenset(self.position_index[goal_block][pos]
+                                     for pos in self.goal_positions
+                                     if pos in self.position_index[goal_block])
+        self.moves = []        # 移动编号 -> (方块序号, dx, dy)
+        self.move_codes = {}
+        self.max_bytes = max_bytes
+        self.table_bytes = 0   # 移动表的估计大小
+        self.groups = self._build_groups()
+        self.symmetry = self._interchangeable_classes()
+        # 移动编号 -> 移动可互换的方块时重新排序所需的参数（见 _reorder_spec），其他移动为 None
+        self.symmetric_moves = [self._reorder_spec(code) for code in range(len(self.moves))]
+        self._heuristic_tables = None
+
+    def _block_positions(self, x, y, width, height, direction):
+        xs = range(self.columns - width + 1) if direction in (HORIZONTAL, BOTH) else [x]
+        ys = range(self.rows - height + 1) if direction in (VERTICAL, BOTH) else [y]
+        return [(px, py) for py in ys for px in xs]
+
+    def _footprint(self, x, y, width, height):
+        mask = 0
+        for j in range(y, y + height):
+            for i in range(x, x + width):
+                mask |= 1 << (j * self.columns + i)
+        return mask
+
+    def _directions(self, direction):
+        if direction == HORIZONTAL:
+            return [(-1, 0), (1, 0)]
+        if direction == VERTICAL:
+            return [(0, -1), (0, 1)]
+        return [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+    def _build_groups(self):
+        # 把相邻方块分组，每组按组内位置组合预先算好：
+        # (组占用掩码, 组内所有移动需要检查的格子掩码, {这些格子的占用情况: 合法移动})
+        # 这样展开一个状态只需要每组查两次表，不再逐个方块做重叠判断
+        groups = []
+        current, combos, cells = [], 1, 0
+        for i in range(self.size):
+            block_combos = len(self.positions[i])
+            block_cells = max(bin(self._need_union(i, p)).count('1')
+                              for p in range(len(self.positions[i])))
+            if current and (combos * block_combos) << (cells + block_cells) > GROUP_ENTRIES:
+                groups.append(current)
+                current, combos, cells = [], 1, 0
+            current.append(i)
+            combos *= block_combos
+            cells += block_cells
+        if current:
+            groups.append(current)
+        return tuple(self._group_table(group) for group in groups)
+
+    def _need_union(self, i, p):
+        union = 0
+        for _, need, _, _ in self.steps[i][p]:
+            union |= need
+        return union
+
+    def _group_table(self, group):
+        shift = self.shifts[group[0]]
+        bits = self.shifts[group[-1]] + self.field_masks[group[-1]].bit_length() - shift
+        table = [None] * (1 << bits)
+        combos = []
+        for combo in product(*(range(len(self.positions[i])) for i in group)):
+            value, footprint, moves = 0, 0, []
+            for i, p in zip(group, combo):
+                value |= p << (self.shifts[i] - shift)
+                footprint |= self.footprints[i][p]
+                for q, need, dx, dy in self.steps[i][p]:
+                    moves.append(((q - p) << self.shifts[i], need, self.move_code((i, dx, dy))))
+            union = 0
+            for _, need, _ in moves:
+                union |= need
+            combos.append((value, footprint, union, moves))
+
+        # 先算出整张表的大小，太大时改为逐个检查，超出内存上限时在分配之前就停止
+        entries = sum(1 << bin(union).count('1') for _, _, union, _ in combos)
+        enumerate_legal = entries <= LEGAL_TABLE_ENTRIES
+        self.table_bytes += (entries if enumerate_legal else len(combos)) * LEGAL_ENTRY_BYTES
+        if self.max_bytes is not None and self.table_bytes > self.max_bytes:
+            raise MemoryLimitExceeded(f"移动表超出内存上限: {self.table_bytes} > {self.max_bytes} 字节")
+
+        for value, footprint, union, moves in combos:
+            if not enumerate_legal:
+                table[value] = (footprint, union, NeedCheck(moves))
+                continue
+            legal = {}
+            occupied = union
+            while True:
+                legal[occupied] = tuple((delta, move) for delta, need, move in moves
+                                        if not occupied & need)
+                if not occupied:
+                    break
+                occupied = (occupied - 1) & union
+            table[value] = (footprint, union, legal)
+        return shift, (1 << bits) - 1, tuple(table)
+
+    def _interchangeable_classes(self):
+        # 形状相同、可以自由移动的方块互换位置后棋盘完全一样（是否解开只看目标方块），归为一类：
+        # (方块序号, 各方块的位移, 位置编号掩码)。横向/纵向方块只能在自己的行/列里移动，
+        # 同一行（列）的也无法互相越过，永远不会出现互换后的状态，不需要归类
+        classes = {}
+        for i, (_, _, width, height, direction) in enumerate(self.specs):
+            if direction == BOTH and i != self.goal_block:
+                classes.setdefault((width, height), []).append(i)
+        return tuple((tuple(members), tuple(self.shifts[i] for i in members), self.field_masks[members[0]])
+                     for members in classes.values() if len(members) > 1)
+
+    def canonical(self, state):
+        # 同类方块的位置编号从小到大重新分配，互换同类方块得到的状态都映射到同一个值
+        # 搜索中保存的都是规范形式，方块序号因此可能与实际的方块不对应，路径用 concrete_path 换回
+        for _, shifts, field_mask in self.symmetry:
+            values = sorted((state >> shift) & field_mask for shift in shifts)
+            for shift, value in zip(shifts, values):
+                state = state & ~(field_mask << shift) | (value << shift)
+        return state
+
+    def _reorder_spec(self, code):
+        # 规范形式中同类方块按序号排列时位置编号递增，移动一个方块后只需把它往前或往后挪到正确的位置：
+        # (该方块的位移, 需要依次比较的同类方块的位移, 位置编号掩码, 位置编号是否增大)
+        i, dx, dy = self.moves[code]
+        for members, shifts, field_mask in self.symmetry:
+            if i in members:
+                rank = members.index(i)
+                increasing = dx > 0 or dy > 0
+                others = shifts[rank + 1:] if increasing else shifts[:rank][::-1]
+                return self.shifts[i], others, field_mask, increasing
+        return None
+
+    def canonical_after(self, state, code):
+        # 规范形式的状态执行移动 code 之后的规范形式，比 canonical 快
+        shift, others, field_mask, increasing = self.symmetric_moves[code]
+        value = (state >> shift) & field_mask
+        for other in others:
+            other_value = (state >> other) & field_mask
+            if (other_value > value) if increasing else (other_value < value):
+                break
+            # 同类方块的位置编号互不相同，交换两者
+            swap = value ^ other_value
+            state ^= (swap << shift) | (swap << other)
+            shift = other
+        return state
+
+    def concrete_path(self, start, steps):
+        # 从实际的起始状态重放 [(x, y, dx, dy), ...]（移动前方块左上角的格子和位移），
+        # 得到实际方块的移动 [(方块序号, dx, dy), ...]；方块互不重叠，左上角的格子能确定是哪个方块
+        coords = list(self.unpack(start))
+        owner = {pos: i for i, pos in enumerate(coords)}
+        path = []
+        for x, y, dx, dy in steps:
+            i = owner.pop((x, y))
+            coords[i] = (x + dx, y + dy)
+            owner[coords[i]] = i
+            path.append((i, dx, dy))
+        return path
+
+    def move_code(self, move):
+        if move not in self.move_codes:
+            self.move_codes[move] = len(self.moves)
+            self.moves.append(move)
+        return self.move_codes[move]
+
+    def pack(self, coords):
+        state = 0
+        for i, pos in enumerate(coords):
+            state |= self.position_index[i][tuple(pos)] << self.shifts[i]
+        return state
+
+    def unpack(self, state):
+        return tuple(self.positions[i][(state >> self.shifts[i]) & self.field_masks[i]]
+                     for i in range(self.size))
+
+    def occupancy(self, state):
+        occ = 0
+        for shift, field_mask, table in self.groups:
+            occ |= table[(state >> shift) & field_mask][0]
+        return occ
+
+    def is_goal(self, state):
+        g = self.goal_block
+        return (state >> self.shifts[g]) & self.field_masks[g] in self.goal_values
+
+    def step(self, state, code):
+        # 用位置表示的移动 (x, y, dx, dy)，与方块序号无关
+        i, dx, dy = self.moves[code]
+        x, y = self.positions[i][(state >> self.shifts[i]) & self.field_masks[i]]
+        return x, y, dx, dy
+
+    def goal_states(self):
+        # 枚举所有互不重叠、且目标方块在目标位置上的状态
+        # 同一行的横向方块（同一列的纵向方块）不能互相越过，保持初始的先后顺序
+        # 可互换的同类方块只枚举位置编号递增的排列，即只生成规范形式
+        order = [self.goal_block] + [i for i in range(self.size) if i != self.goal_block]
+        previous_member = {}
+        for members, _, _ in self.symmetry:
+            previous_member.update(zip(members[1:], members))
+        before = [[] for _ in range(self.size)]  # (必须在它前面的方块, 坐标轴)
+        after = [[] for _ in range(self.size)]
+        for i, (x, y, _, _, direction) in enumerate(self.specs):
+            for j, (ox, oy, _, _, other) in enumerate(self.specs):
+                if direction != other or direction == BOTH:
+                    continue
+                axis = 0 if direction == HORIZONTAL else 1
+                if (x, y)[1 - axis] == (ox, oy)[1 - axis] and (ox, oy)[axis] < (x, y)[axis]:
+                    before[i].append((j, axis))
+                    after[j].append((i, axis))
+
+        def place(k, occ, state, placed):
+            if k == len(order):
+                yield state
+                return
+            i = order[k]
+            candidates = self.goal_values if i == self.goal_block else range(len(self.positions[i]))
+            if i in previous_member:
+                j = previous_member[i]
+                candidates = range(self.position_index[j][placed[j]] + 1, len(self.positions[i]))
+            for p in candidates:
+                footprint = self.footprints[i][p]
+                if occ & footprint:
+                    continue
+                pos = self.positions[i][p]
+                if any(j in placed and placed[j][axis] > pos[axis] for j, axis in before[i]):
+                    continue
+                if any(j in placed and placed[j][axis] < pos[axis] for j, axis in after[i]):
+                    continue
+                placed[i] = pos
+                yield from place(k + 1, occ | footprint, state | (p << self.shifts[i]), placed)
+                del placed[i]
+
+        return place(0, 0, 0, {})
+
+    def heuristic(self, state):
+        # 可采纳的估价：目标方块到出口的距离，加上挡在它前进路线上的每个方块离开路线所需的最少步数
+        if self._heuristic_tables is None:
+            self._heuristic_tables = self._build_heuristic()
+        key_cost, clearance = self._heuristic_tables
+        g = self.goal_block
+        p = (state >> self.shifts[g]) & self.field_masks[g]
+        h = key_cost[p]
+        for shift, field_mask, costs in clearance[p]:
+            h += costs[(state >> shift) & field_mask]
+        return h
+
+    def _build_heuristic(self):
+        g = self.goal_block
+        goals = [self.positions[g][v] for v in self.goal_values]
+        key_cost, clearance = [], []
+        for p, (x, y) in enumerate(self.positions[g]):
+            if not goals:
+                key_cost.append(0)
+                clearance.append(())
+                continue
+            distance, (gx, gy) = min((self._distance((x, y), goal), goal) for goal in goals)
+            key_cost.append(distance)
+            # 只有目标方块沿固定的行/列前进时，前进路线上的格子才是确定的
+            corridor = 0
+            if self.specs[g][4] != BOTH and len(goals) == 1:
+                footprint = self.footprints[g][p]
+                target = self.footprints[g][self.position_index[g][(gx, gy)]]
+                corridor = self._sweep(footprint | target) & ~footprint
+            costs = []
+            for j in range(self.size):
+                if j == g or not corridor:
+                    continue
+                row = [self._clearance(j, q, corridor) for q in range(len(self.positions[j]))]
+                if any(row):
+                    costs.append((self.shifts[j], self.field_masks[j], tuple(row)))
+            clearance.append(tuple(costs))
+        return key_cost, clearance
+
+    def _distance(self, a, b):
+        # 忽略其他方块时从 a 移到 b 至少需要的步数
+        if self.move_model == UNIT:
+            return abs(a[0] - b[0]) + abs(a[1] - b[1])
+        return (a[0] != b[0]) + (a[1] != b[1])
+
+    def _sweep(self, mask):
+        # 两个位置之间（含两端）的所有格子
+        cells = [(c % self.columns, c // self.columns) for c in range(self.columns * self.rows) if mask >> c & 1]
+        xs = [c[0] for c in cells]
+        ys = [c[1] for c in cells]
+        return self._footprint(min(xs), min(ys), max(xs) - min(xs) + 1, max(ys) - min(ys) + 1)
+
+    def _clearance(self, j, q, corridor):
+        if not self.footprints[j][q] & corridor:
+            return 0
+        x, y = self.positions[j][q]
+        free = [self._distance((x, y), pos) for r, pos in enumerate(self.positions[j])
+                if not self.footprints[j][r] & corridor]
+        return min(free) if free else 1
+
+    def successors(self, state):
+        # 生成 (新状态, 移动编号)
+        occ = 0
+        entries = []
+        for shift, field_mask, table in self.groups:
+            entry = table[(state >> shift) & field_mask]
+            occ |= entry[0]
+            entries.append(entry)
+        for _, union, legal in entries:
+            for delta, move in legal[occ & union]:
+                yield state + delta, move
+
+    def canonical_successors(self, state):
+        # 与 successors 相同，但规范形式的状态生成的新状态也是规范形式
+        for new_state, move in self.successors(state):
+            if self.symmetric_moves[move]:
+                new_state = self.canonical_after(new_state, move)
+            yield new_state, move
+
+
+class SearchMonitor:
+    # 逐层统计：每搜索完一层记录展开的节点数、新一层的大小、已访问的状态数、重复命中率和耗时，
+    # 记录追加到 stats['levels']，并在给出 on_level 时立即回调，供界面实时显示
+    def __init__(self, stats, on_level=None):
+        self.levels = stats['levels'] = []
+        self.on_level = on_level
+        self.started = time.monotonic()
+
+    def level(self, depth, expanded, generated, frontier, visited, nbytes, side=None):
+        # generated: 本层生成的后继数（含重复）；frontier: 其中新状态的个数
+        duplicates = generated - frontier
+        record = {
+            'depth': depth,
+            'expanded': expanded,
+            'frontier': frontier,
+            'visited': visited,
+            'generated': generated,
+            'duplicates': duplicates,
+            'duplicate_rate': duplicates / generated if generated else 0.0,
+            'bytes': nbytes,
+            'elapsed': time.monotonic() - self.started,
+        }
+        if side is not None:
+            record['side'] = side
+        self.levels.append(record)
+        if self.on_level is not None:
+            self.on_level(record)
+
+
+class StateStore:
+    # 紧凑的状态表：按加入顺序保存打包状态、父节点下标和移动编号，
+    # 找到目标后沿父节点回溯一次即可重建路径
+    def __init__(self, board, max_bytes=None, deadline=None, progress=None):
+        self.board = board
+        self.max_bytes = max_bytes
+        self.deadline = deadline  # time.monotonic() 的截止时间
+        self.progress = progress  # 定期以已保存的状态数调用，可以抛出异常来中止搜索
+        self.states = array('Q') if board.state_bits <= 64 else []
+        self.parents = array('i')
+        self.moves = array('H')
+
+    def __len__(self):
+        return len(self.parents)
+
+    def add(self, state, parent=-1, move=0):
+        self.states.append(state)
+        self.parents.append(parent)
+        self.moves.append(move)
+        return len(self.parents) - 1
+
+    def nbytes(self):
+        if isinstance(self.states, array):
+            state_bytes = self.states.itemsize * len(self.states)
+        else:
+            state_bytes = sys.getsizeof(self.states) + len(self.states) * sys.getsizeof(1 << self.board.state_bits)
+        return state_bytes + self.parents.itemsize * len(self.parents) + self.moves.itemsize * len(self.moves)
+
+    def check(self, seen=0, extra_bytes=0):
+        # seen: 搜索过程中另外保存在集合/字典里的状态数；extra_bytes: 其他结构占用的字节数
+        if self.max_bytes is not None:
+            used = self.nbytes() + seen * SEEN_STATE_BYTES + extra_bytes
+            if used > self.max_bytes:
+                raise MemoryLimitExceeded(f"搜索超出内存上限: {used} > {self.max_bytes} 字节")
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise SearchTimeout("搜索超时")
+        if self.progress is not None:
+            self.progress(len(self))
+
+    def steps(self, index):
+        # 从根到 index 的移动，用位置表示，见 Board.step
+        steps = []
+        while self.parents[index] >= 0:
+            parent = self.parents[index]
+            steps.append(self.board.step(self.states[parent], self.moves[index]))
+            index = parent
+        steps.reverse()
+        return steps
+
+
+class TranspositionTable:
+    # 固定大小的置换表：状态按散列值映射到一个桶（TRANSPOSITION_WAYS 个槽位），记录本轮迭代中到达它的最少步数，
+    # 再次以不少于这个步数到达时，它的子树已经或正在搜索，可以剪掉。
+    # 桶满时挤掉步数最多的一项（子树最小，剪枝的价值最低），被挤掉的状态只是会重复搜索，不影响结果
+    def __init__(self, board, entries):
+        # 实际项数是不超过 entries 的 TRANSPOSITION_WAYS 乘以 2 的幂
+        bits = max(0, (entries // TRANSPOSITION_WAYS).bit_length() - 1)
+        self.size = TRANSPOSITION_WAYS << bits
+        self.shift = 64 - bits
+        self.keys = array('Q', bytes(8 * self.size)) if board.state_bits <= 64 else [0] * self.size
+        self.depths = array('H', bytes(2 * self.size))
+        self.rounds = array('H', bytes(2 * self.size))  # 与 round 不同的槽位视为空
+        self.round = 0
+        self.filled = 0
+        self.state_bits = board.state_bits
+
+    def next_round(self):
+        self.round += 1
+        if self.round > 0xFFFF:
+            self.rounds = array('H', bytes(2 * self.size))
+            self.round = 1
+        self.filled = 0
+
+    def _bucket(self, state):
+        first = (((hash(state) * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> self.shift) * TRANSPOSITION_WAYS
+        return range(first, first + TRANSPOSITION_WAYS)
+
+    def __contains__(self, state):
+        # 一轮中槽位只会被占用不会被清空，桶里的状态总是排在空槽位前面
+        for slot in self._bucket(state):
+            if self.rounds[slot] != self.round:
+                return False
+            if self.keys[slot] == state:
+                return True
+        return False
+
+    def visit(self, state, depth):
+        # 本轮第一次以不多于 depth 步到达 state 时记录下来并返回 True，否则返回 False
+        victim = None
+        for slot in self._bucket(state):
+            if self.rounds[slot] != self.round:
+                self.filled += 1
+                victim = slot
+                break
+            if self.keys[slot] == state:
+                if self.depths[slot] <= depth:
+                    return False
+                victim = slot
+                break
+            if self.depths[slot] > depth and (victim is None or self.depths[slot] > self.depths[victim]):
+                victim = slot
+        if victim is not None:
+            self.keys[victim] = state
+            self.depths[victim] = depth
+            self.rounds[victim] = self.round
+        return True
+
+    def closed(self, successors):
+        # 本轮记录的每个状态的后继是否也都在表里，是的话表里就是所有可达的状态
+        current = self.round
+        return all(new_state in self
+                   for state, state_round in zip(self.keys, self.rounds) if state_round == current
+                   for new_state, _ in successors(state))
+
+    @staticmethod
+    def entry_bytes(state_bits):
+        # 每项的字节数：不超过 64 位的状态存在 array('Q') 中；更宽的状态存在 list 中，
+        # 8 字节的状态换成 8 字节的指针再加一个 int 对象，比 array 大好几倍
+        if state_bits <= 64:
+            return TRANSPOSITION_ENTRY_BYTES
+        return TRANSPOSITION_ENTRY_BYTES + sys.getsizeof(1 << state_bits)
+
+    @staticmethod
+    def fixed_bytes(state_bits):
+        # 与项数无关的开销：list 对象本身
+        return 0 if state_bits <= 64 else sys.getsizeof([])
+
+    def nbytes(self):
+        return self.fixed_bytes(self.state_bits) + self.size * self.entry_bytes(self.state_bits)
+
+
+def solve(board, start, max_bytes=None, strategy=BFS, time_limit=None, stats=None, progress=None, on_level=None):
+    # 返回 [(方块序号, dx, dy), ...]，无解时返回 None
+    # strategy: 'bfs' 逐层广度优先；'astar' 带可采纳估价的 A*；'bidirectional' 从起点和所有目标状态同时搜索；
+    # 'vector' 与 'bfs' 相同，但用 NumPy 一次展开整层（需要安装 numpy）；
+    # 'idastar' 迭代加深 A*，只占用一张大小固定的置换表，用重复展开换取内存上限
+    # 所有策略返回的步数都是最少的
+    # time_limit: 超过这么多秒抛出 SearchTimeout；stats: 传入字典时写入展开的节点数和保存的状态数
+    # progress: 搜索过程中定期以已保存的状态数调用
+    # on_level: 每搜索完一层以该层的统计字典调用（见 SearchMonitor），同样的记录也写入 stats['levels']；
+    # A* 没有层的概念，按估价总和 f 的上界分层；IDA* 每轮迭代记录一层
+    solvers = {BFS: _solve_bfs, ASTAR: _solve_astar, BIDIRECTIONAL: _solve_bidirectional, VECTOR: _solve_vector,
+               IDASTAR: _solve_idastar}
+    if strategy not in solvers:
+        raise ValueError(f"未知的搜索策略: {strategy}")
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    limits = (max_bytes, deadline, progress)
+    stats = {} if stats is None else stats
+    return solvers[strategy](board, start, limits, stats, SearchMonitor(stats, on_level))
+
+
+def unit_steps(path):
+    # 把滑动若干格的移动展开成逐格移动，供逐步播放使用
+    steps = []
+    for i, dx, dy in path:
+        step_x = (dx > 0) - (dx < 0)
+        step_y = (dy > 0) - (dy < 0)
+        steps.extend([(i, step_x, step_y)] * max(abs(dx), abs(dy)))
+    return steps
+
+
+def _record(stats, expanded, *stores):
+    stats['nodes_expanded'] = expanded
+    stats['states_stored'] = sum(len(store) for store in stores)
+
+
+def _solve_bfs(board, start, limits, stats, monitor):
+    # 移动都是可逆的，新状态只可能与上一层、本层或下一层重复，
+    # 所以集合里只保留这三层，更早的状态只存在紧凑的 StateStore 中
+    # 有可互换的方块时只保存规范形式，移动了这类方块之后才需要重新求规范形式
+    canonical_after = board.canonical_after if board.symmetry else None
+    symmetric_moves = board.symmetric_moves
+    store = StateStore(board, *limits)
+    root = board.canonical(start)
+    store.add(root)
+    seen = {root}
+    states = store.states
+    is_goal = board.is_goal
+    groups = board.groups
+    previous_start = level_start = 0
+    index = -1
+
+    try:
+        while level_start < len(store):
+            level_end = len(store)
+            generated = 0
+            for index in range(level_start, level_end):
+                state = states[index]
+                if is_goal(state):
+                    return board.concrete_path(start, store.steps(index))
+
+                # 与 Board.successors 相同，内联以减少函数调用开销
+                occ = 0
+                entries = []
+                for shift, field_mask, table in groups:
+                    entry = table[(state >> shift) & field_mask]
+                    occ |= entry[0]
+                    entries.append(entry)
+                for _, union, legal in entries:
+                    moves = legal[occ & union]
+                    generated += len(moves)
+                    for delta, move in moves:
+                        new_state = state + delta
+                        if canonical_after and symmetric_moves[move]:
+                            new_state = canonical_after(new_state, move)
+                        if new_state not in seen:
+                            seen.add(new_state)
+                            store.add(new_state, index, move)
+
+                if not index & 0xfff:
+                    store.check(len(seen))
+
+            # 丢弃上一层，集合里只剩本层和下一层
+            for old in range(previous_start, level_start):
+                seen.discard(states[old])
+            store.check(len(seen))
+            monitor.level(len(monitor.levels), level_end - level_start, generated, len(store) - level_end,
+                          len(store), store.nbytes() + len(seen) * SEEN_STATE_BYTES)
+            previous_start, level_start = level_start, level_end
+
+        return None  # 如果没有找到解决方案
+    finally:
+        _record(stats, index + 1, store)
+
+
+def _solve_vector(board, start, limits, stats, monitor):
+    # numpy 只在用到这个策略时才导入
+    from vector_solver import solve_vectorized
+    return solve_vectorized(board, start, limits, stats, monitor)
+
+
+def _solve_astar(board, start, limits, stats, monitor):
+    store = StateStore(board, *limits)
+    heuristic = board.heuristic
+    successors = board.canonical_successors if board.symmetry else board.successors
+    root = board.canonical(start)
+    best = {root: 0}
+    closed = set()
+    tie = count()
+    # 估价相同时优先展开更深的节点
+    heap = [(heuristic(root), 0, next(tie), store.add(root))]
+    states = store.states
+    bound = heap[0][0]  # 当前展开的 f 值，f 增大时记录一层
+    level_closed = level_stored = generated = 0
+
+    try:
+        while heap:
+            f, neg_g, _, index = heapq.heappop(heap)
+            state = states[index]
+            if state in closed:
+                continue
+            if f > bound:
+                monitor.level(bound, len(closed) - level_closed, generated, len(store) - level_stored,
+                              len(store), store.nbytes() + (len(best) + len(closed)) * SEEN_STATE_BYTES)
+                bound, level_closed, level_stored, generated = f, len(closed), len(store), 0
+            if board.is_goal(state):
+                return board.concrete_path(start, store.steps(index))
+            closed.add(state)
+
+            g = 1 - neg_g
+            for new_state, move in successors(state):
+                generated += 1
+                if new_state in closed or best.get(new_state, g + 1) <= g:
+                    continue
+                best[new_state] = g
+                heapq.heappush(heap, (g + heuristic(new_state), -g, next(tie), store.add(new_state, index, move)))
+
+            if len(closed) & 0xfff == 0:
+                store.check(len(best) + len(closed))
+
+        return None
+    finally:
+        _record(stats, len(closed), store)
+
+
+def _solve_idastar(board, start, limits, stats, monitor):
+    # 迭代加深 A*：深度优先搜索估价总和 f 不超过上界的路径，找不到解时把上界提高到被剪掉的最小 f 再搜一轮。
+    # 只保存当前路径和一张大小固定的置换表，内存在开始搜索前就确定了，代价是每轮都要重新展开前面的状态
+    max_bytes, deadline, progress = limits
+    entries = TRANSPOSITION_ENTRIES
+    if max_bytes is not None:
+        # 按实际使用的存储方式估算每项的开销，与 TranspositionTable.nbytes 的算法相同
+        entry_bytes = TranspositionTable.entry_bytes(board.state_bits)
+        entries = min(entries, (max_bytes - TranspositionTable.fixed_bytes(board.state_bits)) // entry_bytes)
+        if entries < TRANSPOSITION_WAYS:
+            raise MemoryLimitExceeded(f"内存上限不足以建立置换表: {max_bytes} 字节")
+    table = TranspositionTable(board, entries)
+    heuristic = board.heuristic
+    is_goal = board.is_goal
+    successors = board.canonical_successors if board.symmetry else board.successors
+    root = board.canonical(start)
+    bound = heuristic(root)
+    expanded = 0
+    previous_filled = None
+
+    def children(path, bound):
+        # 路径末端状态的子节点 [(f, 新状态, 移动编号), ...]，按 f 从大到小排列，从末尾取出；
+        # 返回值之外还有被上界剪掉的子节点数和其中最小的 f
+        state = path[-1]
+        parent = path[-2] if len(path) > 1 else None
+        g = len(path)
+        result = []
+        generated = cut = 0
+        cut_bound = None
+        for new_state, move in successors(state):
+            generated += 1
+            if new_state == parent:
+                continue
+            f = g + heuristic(new_state)
+            if f > bound:
+                cut += 1
+                if cut_bound is None or f < cut_bound:
+                    cut_bound = f
+            elif table.visit(new_state, g):
+                result.append((f, new_state, move))
+        result.sort(reverse=True)
+        return result, generated, cut, cut_bound
+
+    try:
+        if is_goal(root):
+            return []
+        while True:
+            table.next_round()
+            table.visit(root, 0)
+            path = [root]    # 当前路径上的状态
+            codes = [None]   # 到达路径上各状态的移动编号
+            frames = []      # 路径上各状态还没有搜索的子节点
+            next_bound = None
+            round_start = expanded
+            generated = cut = 0
+            while path:
+                if len(frames) < len(path):
+                    pending, new_generated, new_cut, cut_bound = children(path, bound)
+                    frames.append(pending)
+                    expanded += 1
+                    generated += new_generated
+                    cut += new_cut
+                    if cut_bound is not None and (next_bound is None or cut_bound < next_bound):
+                        next_bound = cut_bound
+                    if not expanded & 0xfff:
+                        if deadline is not None and time.monotonic() > deadline:
+                            raise SearchTimeout("搜索超时")
+                        if progress is not None:
+                            progress(expanded)
+                pending = frames[-1]
+                if not pending:
+                    frames.pop()
+                    path.pop()
+                    codes.pop()
+                    continue
+                _, state, move = pending.pop()
+                path.append(state)
+                codes.append(move)
+                if is_goal(state):
+                    steps = [board.step(path[k], codes[k + 1]) for k in range(len(path) - 1)]
+                    return board.concrete_path(start, steps)
+
+            monitor.level(bound, expanded - round_start, generated, cut, table.filled, table.nbytes())
+            if next_bound is None:
+                return None  # 所有可达的状态都搜索过了
+            # 无解时上界会一格一格地一直增加下去；某一轮没有到达新的状态，并且表里的状态对移动封闭，
+            # 就说明所有可达的状态都在表里了，其中没有目标状态
+            if table.filled == previous_filled and table.closed(successors):
+                return None
+            previous_filled = table.filled
+            bound = next_bound
+    finally:
+        stats['nodes_expanded'] = expanded
+        stats['states_stored'] = table.filled
+
+
+def _solve_bidirectional(board, start, limits, stats, monitor):
+    # 正向从起点、反向从所有目标状态同时逐层扩展，每次扩展较小的一侧，
+    # 第一次相遇时的总步数就是最短步数
+    successors = board.canonical_successors if board.symmetry else board.successors
+    forward = StateStore(board, *limits)
+    backward = StateStore(board, *limits)
+    root = board.canonical(start)
+    forward_index = {root: forward.add(root)}
+    backward_index = {}
+    expanded = 0
+
+    try:
+        # goal_states 只生成规范形式
+        for state in board.goal_states():
+            backward_index[state] = backward.add(state)
+            if len(backward) & 0xfff == 0:
+                backward.check(len(backward_index), forward.nbytes())
+
+        if root in backward_index:
+            return []
+        sides = [(forward, forward_index, [0]), (backward, backward_index, [0])]
+
+        while all(len(store) > levels[-1] for store, _, levels in sides):
+            # 选择当前层较小的一侧
+            frontier_sizes = [len(store) - levels[-1] for store, _, levels in sides]
+            side = 0 if frontier_sizes[0] <= frontier_sizes[1] else 1
+            store, index_of, levels = sides[side]
+            other_store, other_index, _ = sides[1 - side]
+            level_end = len(store)
+            generated = 0
+
+            for index in range(levels[-1], level_end):
+                expanded += 1
+                state = store.states[index]
+                for new_state, move in successors(state):
+                    generated += 1
+                    if new_state in other_index:
+                        step = board.step(state, move)
+                        if side == 0:
+                            head = forward.steps(index) + [step]
+                            tail = backward.steps(other_index[new_state])
+                        else:
+                            head = forward.steps(other_index[new_state])
+                            tail = backward.steps(index) + [step]
+                        # 反向搜索的路径要倒过来并取逆：移动后方块所在的格子往回移
+                        tail = [(x + dx, y + dy, -dx, -dy) for x, y, dx, dy in reversed(tail)]
+                        return board.concrete_path(start, head + tail)
+                    if new_state not in index_of:
+                        index_of[new_state] = store.add(new_state, index, move)
+
+                if index & 0xfff == 0:
+                    store.check(len(forward_index) + len(backward_index), other_store.nbytes())
+
+            monitor.level(len(levels) - 1, level_end - levels[-1], generated, len(store) - level_end,
+                          len(forward) + len(backward),
+                          forward.nbytes() + backward.nbytes() + (len(forward_index) + len(backward_index)) * SEEN_STATE_BYTES,
+                          ('forward', 'backward')[side])
+            levels.append(level_end)
+
+        return None
+    finally:
+        _record(stats, expanded, forward, backward)
@@ -0,0 +1,65 @@
+import pygame
+
+# 求解统计浮层：把后台求解器逐层的统计（见 solver.SearchMonitor）画成一张小表，
+# 求解过程中每帧刷新，求解结束后保留最后一次的结果
+
+OVERLAY_ROWS = 12  # 最多显示最近多少层
+OVERLAY_TEXT = (255, 255, 255)
+OVERLAY_BACKGROUND = (0, 0, 0, 190)
+OVERLAY_PADDING = 6
+
+# (表头, 列宽, 格式化函数)
+COLUMNS = [
+    ('depth', 56, lambda r: f"{r['depth']}{r['side'][0].upper() if 'side' in r else ''}"),
+    ('expanded', 80, lambda r: f"{r['expanded']}"),
+    ('frontier', 80, lambda r: f"{r['frontier']}"),
+    ('visited', 80, lambda r: f"{r['visited']}"),
+    ('dup%', 52, lambda r: f"{r['duplicate_rate'] * 100:.1f}"),
+    ('memory', 68, lambda r: format_bytes(r['bytes'])),
+    ('time', 56, lambda r: f"{r['elapsed']:.2f}s"),
+]
+
+
+def format_bytes(n):
+    for unit in ('B', 'KB', 'MB'):
+        if n < 1024:
+            return f"{n:.0f}{unit}"
+        n /= 1024
+    return f"{n:.1f}GB"
+
+
+def overlay_rect(font, pos=(10, 10)):
+    # 显示满 OVERLAY_ROWS 层时浮层占的区域，求解过程中按这个区域逐帧重绘
+    width = sum(column_width for _, column_width, _ in COLUMNS) + 2 * OVERLAY_PADDING
+    height = (OVERLAY_ROWS + 2) * font.get_linesize() + 2 * OVERLAY_PADDING
+    return pygame.Rect(pos, (width, height))
+
+
+def draw_stats_overlay(screen, font, solver, pos=(10, 10), surfaces=None):
+    # solver: background.BackgroundSolver；逐列渲染文字，默认字体不是等宽的也能对齐
+    # surfaces: surface_cache.SurfaceCache，已经搜索完的层每帧的文字都一样，从缓存里取
+    if surfaces is None:
+        render = lambda text: font.render(text, True, OVERLAY_TEXT)
+    else:
+        render = lambda text: surfaces.text(font, text, OVERLAY_TEXT)
+    levels = list(solver.levels[-OVERLAY_ROWS:])
+    rows = [[title for title, _, _ in COLUMNS]]
+    rows += [[fmt(record) for _, _, fmt in COLUMNS] for record in levels]
+    status = "solving" if solver.running else "done"
+    summary = f"{status}: {solver.states} states, {len(solver.levels)} levels"
+
+    line_height = font.get_linesize()
+    width = overlay_rect(font, pos).width
+    height = (len(rows) + 1) * line_height + 2 * OVERLAY_PADDING
+    panel = pygame.Surface((width, height), pygame.SRCALPHA)
+    panel.fill(OVERLAY_BACKGROUND)
+
+    y = OVERLAY_PADDING
+    for row in rows:
+        x = OVERLAY_PADDING
+        for text, (_, column_width, _) in zip(row, COLUMNS):
+            panel.blit(render(text), (x, y))
+            x += column_width
+        y += line_height
+    panel.blit(render(summary), (OVERLAY_PADDING, y))
+    return screen.blit(panel, pos)
@@ -0,0 +1,41 @@
+import pygame
+
+# 预渲染表面缓存：静态背景（网格、出口）画成一张表面，渲染过的文字按内容缓存，每帧只需要几次 blit。
+# 背景按窗口尺寸作为键，窗口大小变化时自然会重新生成；换配色后调用 invalidate() 丢掉旧的表面。
+# 方块是纯色矩形，pygame 填充矩形只写不读，比 blit 同样大小的预渲染精灵快，所以方块仍然直接画
+
+TEXT_CACHE_SIZE = 256  # 最多缓存多少条文字（一帧的求解统计浮层约 100 条），每帧都变的文字会把最早的挤出去
+
+
+class SurfaceCache:
+    def __init__(self, draw_background):
+        # draw_background(surface): 在整个表面上画静态背景
+        self.draw_background = draw_background
+        self.invalidate()
+
+    def invalidate(self):
+        self._background = None
+        self._texts = {}
+
+    def background(self, size):
+        if self._background is None or self._background.get_size() != tuple(size):
+            surface = _new_surface(size)
+            self.draw_background(surface)
+            self._background = surface
+        return self._background
+
+    def text(self, font, text, color, background=None):
+        key = (font, text, tuple(color), background and tuple(background))
+        surface = self._texts.pop(key, None)
+        if surface is None:
+            surface = font.render(text, True, color, background)
+            if len(self._texts) >= TEXT_CACHE_SIZE:
+                del self._texts[next(iter(self._texts))]
+        self._texts[key] = surface  # 重新插入，最近用过的排在最后
+        return surface
+
+
+def _new_surface(size):
+    surface = pygame.Surface(size)
+    # 转换成与屏幕相同的像素格式，blit 时不用逐像素转换
+    return surface.convert() if pygame.display.get_surface() is not None else surface
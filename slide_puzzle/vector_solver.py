@@ -0,0 +1,154 @@
+import time
+
+import numpy as np
+
+from solver import MemoryLimitExceeded, SearchTimeout
+
+# NumPy 逐层广度优先搜索
+# 整层的打包状态放在一个 uint64 数组里，占用掩码、合法移动和后继状态对整层一次性算出，
+# 再用排序去重和 searchsorted 与上一层、本层比较，去掉已经访问过的状态。
+# 每层只需要几十次数组运算，而不是对每个状态逐个做重叠判断。
+
+
+class MoveTables:
+    # 每个方块按“位置编号 -> 第 k 个移动”展开成数组：
+    # 是否存在、需要空出的格子、状态增量、移动编号
+    def __init__(self, board):
+        if board.state_bits > 64 or board.columns * board.rows > 64:
+            raise ValueError("状态或棋盘超过 64 位，无法使用向量化搜索")
+        self.board = board
+        self.footprints = [np.array(footprints, dtype=np.uint64) for footprints in board.footprints]
+        self.slots = []  # 每个方块: [(valid, need, delta, code), ...]
+        for i in range(board.size):
+            steps = board.steps[i]
+            width = max(len(moves) for moves in steps)
+            count = len(steps)
+            slots = []
+            for k in range(width):
+                valid = np.zeros(count, dtype=bool)
+                need = np.zeros(count, dtype=np.uint64)
+                delta = np.zeros(count, dtype=np.uint64)
+                code = np.zeros(count, dtype=np.uint16)
+                for p, moves in enumerate(steps):
+                    if k < len(moves):
+                        q, mask, dx, dy = moves[k]
+                        valid[p] = True
+                        need[p] = mask
+                        # 向左/上移动时增量为负，按 uint64 取模相加即可
+                        delta[p] = ((q - p) << board.shifts[i]) & 0xFFFFFFFFFFFFFFFF
+                        code[p] = board.move_code((i, dx, dy))
+                slots.append((valid, need, delta, code))
+            self.slots.append(slots)
+        self.goal_values = np.array(sorted(board.goal_values), dtype=np.uint64)
+
+    def fields(self, states, i):
+        board = self.board
+        return ((states >> np.uint64(board.shifts[i])) & np.uint64(board.field_masks[i])).astype(np.intp)
+
+    def is_goal(self, states):
+        return np.isin(self.fields(states, self.board.goal_block), self.goal_values)
+
+    def canonical(self, states):
+        # 与 Board.canonical 相同：同类方块的位置编号在每个状态内从小到大重新分配
+        for members, shifts, field_mask in self.board.symmetry:
+            fields = np.sort(np.stack([self.fields(states, i) for i in members]), axis=0).astype(np.uint64)
+            cleared = 0
+            for shift in shifts:
+                cleared |= field_mask << shift
+            states = states & np.uint64(~cleared & 0xFFFFFFFFFFFFFFFF)
+            for row, shift in zip(fields, shifts):
+                states = states | (row << np.uint64(shift))
+        return states
+
+    def expand(self, states):
+        # 返回整层的 (后继状态, 父状态下标, 移动编号)，可能有重复
+        fields = [self.fields(states, i) for i in range(self.board.size)]
+        occ = np.zeros(len(states), dtype=np.uint64)
+        for footprints, p in zip(self.footprints, fields):
+            occ |= footprints[p]
+
+        parents = np.arange(len(states), dtype=np.int32)
+        new_states, new_parents, new_moves = [], [], []
+        for slots, p in zip(self.slots, fields):
+            for valid, need, delta, code in slots:
+                legal = valid[p] & ((occ & need[p]) == 0)
+                if not legal.any():
+                    continue
+                p_legal = p[legal]
+                new_states.append(states[legal] + delta[p_legal])
+                new_parents.append(parents[legal])
+                new_moves.append(code[p_legal])
+        if not new_states:
+            empty = np.zeros(0, dtype=np.uint64)
+            return empty, np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.uint16)
+        return np.concatenate(new_states), np.concatenate(new_parents), np.concatenate(new_moves)
+
+
+def _contains(sorted_states, states):
+    # states 中每个元素是否出现在排好序的 sorted_states 里
+    if not len(sorted_states):
+        return np.zeros(len(states), dtype=bool)
+    i = np.searchsorted(sorted_states, states)
+    i[i == len(sorted_states)] = 0
+    return sorted_states[i] == states
+
+
+def solve_vectorized(board, start, limits, stats, monitor):
+    # 与 solver._solve_bfs 相同的逐层搜索，返回最少步数的 [(方块序号, dx, dy), ...]，无解时返回 None
+    # 每层按状态排序保存，同时记下每个状态在上一层中的父状态下标和移动编号
+    # 有可互换的方块时保存的都是规范形式（见 Board.canonical）
+    max_bytes, deadline, progress = limits
+    tables = MoveTables(board)
+    levels = [np.array([board.canonical(start)], dtype=np.uint64)]
+    parents = [np.zeros(1, dtype=np.int32)]
+    moves = [np.zeros(1, dtype=np.uint16)]
+    stored = 1
+    expanded = 0
+
+    try:
+        while len(levels[-1]):
+            frontier = levels[-1]
+            goals = np.flatnonzero(tables.is_goal(frontier))
+            if len(goals):
+                return board.concrete_path(start, _steps(board, levels, parents, moves, int(goals[0])))
+
+            expanded += len(frontier)
+            new_states, new_parents, new_moves = tables.expand(frontier)
+            generated = len(new_states)
+            new_states = tables.canonical(new_states)
+            # 移动都是可逆的，新状态只可能与上一层或本层重复
+            fresh = ~_contains(frontier, new_states)
+            if len(levels) > 1:
+                fresh &= ~_contains(levels[-2], new_states)
+            # np.unique 返回排好序的状态和每个状态第一次出现的位置
+            new_states, first = np.unique(new_states[fresh], return_index=True)
+            levels.append(new_states)
+            parents.append(new_parents[fresh][first])
+            moves.append(new_moves[fresh][first])
+            stored += len(new_states)
+
+            used = sum(a.nbytes for group in (levels, parents, moves) for a in group)
+            used += fresh.nbytes + 14 * len(fresh)  # 本层展开时的临时数组
+            monitor.level(len(levels) - 2, len(frontier), generated, len(new_states), stored, used)
+            if max_bytes is not None and used > max_bytes:
+                raise MemoryLimitExceeded(f"搜索超出内存上限: {used} > {max_bytes} 字节")
+            if deadline is not None and time.monotonic() > deadline:
+                raise SearchTimeout("搜索超时")
+            if progress is not None:
+                progress(stored)
+
+        return None  # 如果没有找到解决方案
+    finally:
+        stats['nodes_expanded'] = expanded
+        stats['states_stored'] = stored
+
+
+def _steps(board, levels, parents, moves, index):
+    # 用位置表示的移动，见 Board.step
+    steps = []
+    for depth in range(len(parents) - 1, 0, -1):
+        parent = int(parents[depth][index])
+        steps.append(board.step(int(levels[depth - 1][parent]), int(moves[depth][index])))
+        index = parent
+    steps.reverse()
+    return steps